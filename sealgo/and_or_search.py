@@ -0,0 +1,252 @@
+import math
+from typing import Dict, Generator, Iterable, List, Set, Tuple
+
+from .search import Search
+from .problem import UncertainSearchProblem, State, Action
+
+OK, FAIL, CYCLE = 0, 1, 2
+
+class ConditionalPlan:
+    """
+    A conditional plan stored as a policy: the action to take in every state the plan can reach.
+    A subplan shared by several branches is stored once, and cyclic plans (try until it works) are allowed.
+
+    Args:
+        initial_state (State): The state the plan starts from.
+        policy (Dict[State, Action|None]): The action of every reachable state, None at goal states.
+        cost (int|float|None, optional): The expected cost of the plan if known. Defaults to None.
+
+    Methods:
+        action(state: State) -> Action|None: Return the action to take in the given state, None at a goal.
+    """
+    def __init__(self, initial_state: State, policy: Dict[State, Action|None], cost: int|float|None = None) -> None:
+        self.initial_state = initial_state
+        self.policy = policy
+        self.cost = cost
+
+    def action(self, state: State) -> Action|None:
+        return self.policy[state]
+
+    def __contains__(self, state: State) -> bool:
+        return state in self.policy
+
+    def __len__(self) -> int:
+        return len(self.policy)
+
+    def __repr__(self) -> str:
+        return f"<ConditionalPlan of {len(self.policy)} states from {self.initial_state}>"
+
+    @classmethod
+    def extract(cls, initial_state: State, policy: Dict[State, Action|None],
+                outcomes, cost: int|float|None = None) -> "ConditionalPlan":
+        """Keep only the states of the policy reachable from the initial state, outcomes(state, action) giving the next states."""
+        plan = {initial_state: policy[initial_state]}
+        stack = [initial_state]
+        while stack:
+            state = stack.pop()
+            action = plan[state]
+            if action is None:
+                continue
+            for next_state in outcomes(state, action):
+                if next_state not in plan:
+                    plan[next_state] = policy[next_state]
+                    stack.append(next_state)
+        return cls(initial_state, plan, cost)
+
+class AndOrSearch(Search):
+    """
+    AndOrSearch class represents a depth-first AND-OR graph search for an acyclic conditional plan.
+    States are memoized as solved (with their action) or failed, so shared subproblems are searched once.
+    A failure caused by a cycle depends on the current path and is not memoized.
+
+    Args:
+        problem (UncertainSearchProblem): The nondeterministic search problem.
+
+    Attributes:
+        solved (Dict[State, Action|None]): The solved states and the first action of their plans.
+        failed (Set[State]): The states from which no acyclic plan exists.
+
+    Methods:
+        search(): Return a ConditionalPlan from the initial state, or None if there is no plan.
+    """
+    def __init__(self, problem: UncertainSearchProblem) -> None:
+        super().__init__(problem)
+        self.solved: Dict[State, Action|None] = {}
+        self.failed: Set[State] = set()
+
+    def search(self) -> ConditionalPlan|None:
+        init = self.problem.initial_state()
+        if self._search(init) != OK:
+            return None
+        return ConditionalPlan.extract(init, self.solved, self._outcomes)
+
+    def _search(self, init: State) -> int:
+        """Run the OR nodes as coroutines on an explicit stack, so deep plans do not hit the recursion limit."""
+        on_path: Set[State] = set()
+        status = self._lookup(init, on_path)
+        if status is not None:
+            return status
+        on_path.add(init)
+        stack = [(init, self._or_node(init))]
+        status = None
+        while stack:
+            state, node = stack[-1]
+            try:
+                next_state = node.send(status)
+            except StopIteration as stop:
+                stack.pop()
+                on_path.discard(state)
+                status = stop.value
+                continue
+            status = self._lookup(next_state, on_path)
+            if status is None:
+                on_path.add(next_state)
+                stack.append((next_state, self._or_node(next_state)))
+        return status
+
+    def _lookup(self, state: State, on_path: Set[State]) -> int|None:
+        if state in self.solved:
+            return OK
+        if state in self.failed:
+            return FAIL
+        if state in on_path:
+            return CYCLE
+        if self.problem.is_goal(state):
+            self.solved[state] = None
+            return OK
+        return None
+
+    def _or_node(self, state: State) -> Generator[State, int, int]:
+        """Try the actions of the state, an action succeeds if all of its outcomes (the AND node) are solved."""
+        cycle = False
+        for action in self.problem.actions(state):
+            status = OK
+            for next_state in self._outcomes(state, action):
+                status = yield next_state
+                if status != OK:
+                    break
+            if status == OK:
+                self.solved[state] = action
+                return OK
+            cycle = cycle or status == CYCLE
+        if cycle:
+            return CYCLE
+        self.failed.add(state)
+        return FAIL
+
+    def _outcomes(self, state: State, action: Action) -> Iterable[State]:
+        return (next_state for next_state, probability in self.problem.result(state, action) if probability > 0)
+
+class LAOStar(Search):
+    """
+    LAOStar class represents the improved LAO* algorithm (ILAO*) for a plan of least expected cost.
+    It grows the best partial plan from the initial state guided by problem.heuristic, and backs values up
+    in depth-first post-order, so plans with cycles are handled. AO* is the special case of acyclic problems.
+    The heuristic must not overestimate the expected cost for the plan to be optimal.
+
+    Args:
+        problem (UncertainSearchProblem): The nondeterministic search problem.
+        epsilon (float, optional): The largest change of a value allowed at convergence. Defaults to 1e-6.
+        max_iter (int, optional): The maximum number of depth-first passes. Defaults to 100000.
+
+    Attributes:
+        values (Dict[State, float]): The expected cost to a goal of every state generated.
+        policy (Dict[State, Action|None]): The best action of every state expanded.
+        transitions (Dict[State, list|None]): The (action, cost, outcomes) of every state expanded, None at goals.
+
+    Methods:
+        search(): Return the optimal ConditionalPlan from the initial state, or None if no goal can be reached.
+    """
+    def __init__(self, problem: UncertainSearchProblem, epsilon: float = 1e-6, max_iter: int = 100000) -> None:
+        super().__init__(problem)
+        self.epsilon = epsilon
+        self.max_iter = max_iter
+        self.values: Dict[State, float] = {}
+        self.policy: Dict[State, Action|None] = {}
+        self.transitions: Dict[State, List[Tuple[Action, float, List[Tuple[State, float]]]]|None] = {}
+
+    def search(self) -> ConditionalPlan|None:
+        init = self.problem.initial_state()
+        self.values.setdefault(init, self.problem.heuristic(init))
+        for _ in range(self.max_iter):
+            changed, residual = self._sweep(init)
+            if changed == 0 and residual < self.epsilon:
+                break
+        if math.isinf(self.values[init]):
+            return None
+        return ConditionalPlan.extract(init, self.policy, self._outcomes, self.values[init])
+
+    def _sweep(self, init: State) -> Tuple[int, float]:
+        """
+        Walk the best partial plan, expand its tip states and back up values in post-order.
+        Return the number of states expanded or whose best action changed, and the largest change of a value.
+        """
+        changed, residual = 0, 0.0
+        visited = {init}
+        stack = [(init, False)]
+        while stack:
+            state, children_done = stack.pop()
+            if children_done:
+                action = self.policy[state]
+                residual = max(residual, self._backup(state))
+                changed += self.policy[state] != action
+                continue
+            if state not in self.transitions:
+                # a tip is expanded and walked through at once, so a pass dives until it reaches goals
+                self._expand(state)
+                changed += 1
+                self._backup(state)
+            stack.append((state, True))
+            action = self.policy.get(state)
+            if action is None:
+                continue
+            for next_state in self._outcomes(state, action):
+                if next_state not in visited:
+                    visited.add(next_state)
+                    stack.append((next_state, False))
+        return changed, residual
+
+    def _expand(self, state: State) -> None:
+        if self.problem.is_goal(state):
+            self.transitions[state] = None
+            self.policy[state] = None
+            return
+        transitions = []
+        for action in self.problem.actions(state):
+            outcomes = [(s, p) for s, p in self.problem.result(state, action) if p > 0]
+            for next_state, _ in outcomes:
+                if next_state not in self.values:
+                    self.values[next_state] = self.problem.heuristic(next_state)
+            transitions.append((action, self.problem.action_cost(state, action), outcomes))
+        self.transitions[state] = transitions
+
+    def _backup(self, state: State) -> float:
+        """Apply the Bellman update to the state and return the change of its value."""
+        transitions = self.transitions[state]
+        if transitions is None:
+            self.values[state] = 0
+            return 0.0
+        best_value, best_action = math.inf, None
+        for action, cost, outcomes in transitions:
+            # a self loop (the action may fail and leave the state as it is) is solved in closed form
+            value, p_stay = cost, 0.0
+            for next_state, p in outcomes:
+                if next_state == state:
+                    p_stay += p
+                else:
+                    value += p * self.values[next_state]
+            if p_stay >= 1:
+                continue
+            value /= 1 - p_stay
+            if value < best_value:
+                best_value, best_action = value, action
+        old_value = self.values[state]
+        self.values[state] = best_value
+        self.policy[state] = best_action
+        if old_value == best_value:
+            return 0.0
+        return abs(best_value - old_value)
+
+    def _outcomes(self, state: State, action: Action) -> Iterable[State]:
+        for next_state, _ in next(outcomes for a, _, outcomes in self.transitions[state] if a == action):
+            yield next_state
@@ -1,5 +1,8 @@
+import math
+import heapq
+from itertools import count
 from queue import PriorityQueue, Queue, LifoQueue
-from typing import List, Callable
+from typing import Dict, Generator, List, Callable, Hashable
 
 from sealgo.problem import State
 
@@ -22,107 +25,637 @@ from .problem import *
 #     }
 # d = Display(icon_paths)
 
+class BucketQueue:
+    """
+    BucketQueue class is a two-level bucket priority queue with the interface of the PriorityQueue of the frontier,
+    for integer priorities in a bounded range. Entries (priority, item) go to the bucket of their priority, then
+    to the sub-bucket of tie(item), and are got from the least priority, the greatest tie, last in first out.
+    A put and a get take constant time, besides skipping the empty buckets between two priorities.
+
+    Args:
+        tie (Callable[[Hashable], int]|None, optional): The secondary priority of an item, the greatest first. Defaults to None.
+
+    Attributes:
+        queue (list): The entries, in no particular order; setting it replaces them.
+    """
+    def __init__(self, tie: Callable[[Hashable], int]|None = None) -> None:
+        self.tie = tie
+        self._buckets: Dict[int, Dict[int, list]] = {}
+        self._tops: Dict[int, int] = {}
+        self._min: int|None = None
+        self._size = 0
+
+    @staticmethod
+    def _index(value: int|float) -> int:
+        index = int(value)
+        if index != value:
+            raise ValueError(f"BucketQueue needs integer priorities, got {value}")
+        return index
+
+    def put(self, entry: tuple) -> None:
+        priority = self._index(entry[0])
+        tie = 0 if self.tie is None else self._index(self.tie(entry[1]))
+        bucket = self._buckets.get(priority)
+        if bucket is None:
+            bucket = self._buckets[priority] = {}
+            self._tops[priority] = tie
+        elif tie > self._tops[priority]:
+            self._tops[priority] = tie
+        bucket.setdefault(tie, []).append(entry)
+        if self._min is None or priority < self._min:
+            self._min = priority
+        self._size += 1
+
+    def get(self) -> tuple:
+        if not self._size:
+            raise IndexError("get from an empty BucketQueue")
+        priority = self._min
+        while priority not in self._buckets:
+            priority += 1
+        bucket = self._buckets[priority]
+        tie = self._tops[priority]
+        while not bucket.get(tie):
+            bucket.pop(tie, None)
+            tie -= 1
+        entries = bucket[tie]
+        entry = entries.pop()
+        if not entries:
+            del bucket[tie]
+        self._tops[priority] = tie
+        if not bucket:
+            del self._buckets[priority]
+            del self._tops[priority]
+        self._size -= 1
+        self._min = priority if self._size else None
+        return entry
+
+    def empty(self) -> bool:
+        return not self._size
+
+    def qsize(self) -> int:
+        return self._size
+
+    @property
+    def queue(self) -> list:
+        return [entry for bucket in self._buckets.values() for entries in bucket.values() for entry in entries]
+
+    @queue.setter
+    def queue(self, entries: list) -> None:
+        self.__init__(self.tie)
+        for entry in entries:
+            self.put(entry)
+
 class BestFirstSearch(Search):
     def __init__(self, problem:SearchProblem) -> None:
         self.problem = problem
+        self._init_keys()
         self.frontier = PriorityQueue()
         init = self.problem.initial_state()
         if isinstance(init, list):
             self.g_costs = {} # cost so far
             self.predecessors = {}
             for state in init:
-                self.g_costs[state] = 0
-                self.predecessors[state] = (None, Action.STAY)
-                self.frontier.put((-1, state))
+                self.g_costs[self._as_key(state)] = 0
+                self.predecessors[self._as_key(state)] = (None, Action.STAY)
+                self.frontier.put((-1, self._stored(state)))
         else:
-            self.g_costs = {init: 0} # cost so far
-            self.predecessors = {init: (None, Action.STAY)}
-            self.frontier.put((-1, init))
-        self.eval_f: Callable = lambda s: 0
-        # self.eval_f must be defined in the subclass
+            self.g_costs = {self._as_key(init): 0} # cost so far
+            self.predecessors = {self._as_key(init): (None, Action.STAY)}
+            self.frontier.put((-1, self._stored(init)))
+        self.eval_f: Callable = lambda s, g: 0
+        # self.eval_f(state, g_cost) must be defined in the subclass
         
     def search(self) -> List[List[Action]]:
+        return self._run(self._steps())
+    
+    def _steps(self) -> Generator[None, None, List[List[Action]]]:
         while not self.frontier.empty():
-            state = self.frontier.get()[1]
+            if self.checkpoint is not None:
+                self.checkpoint.tick(self)
+            state = self._loaded(self.frontier.get()[1])
             if self.problem.is_goal(state):
                 return [self._reconstruct_path(state)]
             self._extend(state)
+            yield
         return []
     
+    def _checkpoint_state(self) -> dict:
+        tables = {"frontier": self.frontier.queue, "predecessors": self.predecessors}
+        if hasattr(self, "g_costs"):
+            tables["g_costs"] = self.g_costs
+        return tables
+    
+    def _restore_state(self, tables: dict) -> None:
+        self.predecessors = tables["predecessors"]
+        if "g_costs" in tables:
+            self.g_costs = tables["g_costs"]
+        # the frontier list of a PriorityQueue is saved in heap order, so it is restored as is,
+        # a BucketQueue puts the entries again, after the g costs its ties are read from
+        self.frontier.queue = tables["frontier"]
+    
+    def _init_keys(self) -> None:
+        # visited tables are keyed on the canonical form of states for symmetric problems
+        self._key: Callable|None = self.problem.canonicalize if getattr(self.problem, "symmetric", False) else None
+        # and on encode(state) for compact problems, whose frontier and predecessors hold keys rather than states
+        self._compact = self._key is None and getattr(self.problem, "compact", False)
+        if self._compact:
+            self._key = self.problem.encode
+    
+    def _use_buckets(self) -> None:
+        """Move the frontier to a BucketQueue, breaking ties of f toward the greatest g, so the least h."""
+        if self._key is None or self._compact:
+            tie = lambda item: self.g_costs[item]
+        else:
+            tie = lambda item: self.g_costs[self._key(item)]
+        frontier = BucketQueue(tie)
+        frontier.queue = self.frontier.queue
+        self.frontier = frontier
+    
+    def _as_key(self, state: State) -> Hashable:
+        """Return the key of the state in the visited tables."""
+        return state if self._key is None else self._key(state)
+    
+    def _stored(self, state: State, key: Hashable|None = None) -> Hashable:
+        """Return what the frontier and the predecessors hold for the state, its key for compact problems."""
+        if not self._compact:
+            return state
+        return self._key(state) if key is None else key
+    
+    def _loaded(self, item: Hashable) -> State:
+        """Return the state of an item of the frontier or the predecessors."""
+        return self.problem.decode(item) if self._compact else item
+    
     def _extend(self, state: State) -> None:
         # d.render(state)
+        key = self._as_key(state)
+        parent = self._stored(state, key)
         for action in self.problem.actions(state):
             next_state = self.problem.result(state, action)
             # d.render(next_state)
-            g_cost = self.g_costs[state] + self.problem.action_cost(state, action)
-            if next_state not in self.g_costs or g_cost < self.g_costs[next_state]:
-                self.predecessors[next_state] = (state, action)
-                self.g_costs[next_state] = g_cost
-                eval = self.eval_f(next_state)
-                self.frontier.put((eval, next_state))
+            next_key = next_state if self._key is None else self._key(next_state)
+            g_cost = self.g_costs[key] + self.problem.action_cost(state, action)
+            if next_key not in self.g_costs or g_cost < self.g_costs[next_key]:
+                self.predecessors[next_key] = (parent, action)
+                self.g_costs[next_key] = g_cost
+                eval = self.eval_f(next_state, g_cost)
+                self.frontier.put((eval, self._stored(next_state, next_key)))
     
     def _reconstruct_path(self, state: State) -> List[Action]:
+        if self._key is not None and not self._compact:
+            return self._replay_path(state)
+        # the predecessors of a compact problem are keys, which are walked the same way as states
+        key = self._as_key(state)
         actions = []
-        while state:
-            state, action = self.predecessors[state]
+        while key is not None:
+            key, action = self.predecessors[key]
             actions.append(action)
         actions.reverse()
         return actions
+    
+    def _replay_path(self, state: State) -> List[Action]:
+        """
+        Reconstruct the path of a symmetric problem. A recorded parent may be an image of the state
+        the path actually reaches, then the action leading to the same canonical child is looked up.
+        """
+        steps = []
+        parent, action = self.predecessors[self._key(state)]
+        while parent is not None:
+            steps.append((parent, action))
+            parent, action = self.predecessors[self._key(parent)]
+        steps.reverse()
+        actions = [action]
+        current = steps[0][0] if steps else state
+        for parent, action in steps:
+            if parent != current:
+                target = self._key(self.problem.result(parent, action))
+                action = next(a for a in self.problem.actions(current)
+                              if self._key(self.problem.result(current, a)) == target)
+            actions.append(action)
+            current = self.problem.result(current, action)
+        return actions
+    
+    def _path_length(self, state: State) -> int:
+        """Return len(self._reconstruct_path(state)) without building the path."""
+        length = 1
+        parent = self.predecessors[self._as_key(state)][0]
+        while parent is not None:
+            length += 1
+            parent = self.predecessors[parent if self._compact else self._as_key(parent)][0]
+        return length
 
 class BFS(BestFirstSearch):
     def __init__(self, problem:SearchProblem):
         self.problem = problem
+        self._init_keys()
         self.frontier = Queue()
-        self.predecessors = {self.problem.initial_state(): (None, Action.STAY)}
-        self.frontier.put(self.problem.initial_state())
+        init = self.problem.initial_state()
+        self.predecessors = {self._as_key(init): (None, Action.STAY)}
+        self.frontier.put(self._stored(init))
         
-    def search(self) -> List[List[Action]]:
+    def _steps(self) -> Generator[None, None, List[List[Action]]]:
         while not self.frontier.empty():
-            state = self.frontier.get()
+            if self.checkpoint is not None:
+                self.checkpoint.tick(self)
+            state = self._loaded(self.frontier.get())
             if self.problem.is_goal(state):
                 return [self._reconstruct_path(state)]
             self._extend(state)
+            yield
         return []
     
     def _extend(self, state: State) -> None:
+        parent = self._stored(state)
         for action in self.problem.actions(state):
             next_state = self.problem.result(state, action)
-            if next_state not in self.predecessors:
-                self.predecessors[next_state] = (state, action)
-                self.frontier.put(next_state)
+            next_key = next_state if self._key is None else self._key(next_state)
+            if next_key not in self.predecessors:
+                self.predecessors[next_key] = (parent, action)
+                self.frontier.put(self._stored(next_state, next_key))
     
 class DFS(BestFirstSearch):
     def __init__(self, problem:SearchProblem, max_depth = 100):
         self.problem = problem
+        self._init_keys()
         self.frontier = LifoQueue()
-        self.predecessors = {self.problem.initial_state(): (None, Action.STAY)}
-        self.frontier.put(self.problem.initial_state())
+        init = self.problem.initial_state()
+        self.predecessors = {self._as_key(init): (None, Action.STAY)}
+        self.frontier.put(self._stored(init))
         self.max_depth = max_depth
         
-    def search(self) -> List[List[Action]]:
+    def _steps(self) -> Generator[None, None, List[List[Action]]]:
         while not self.frontier.empty():
-            state = self.frontier.get()
+            if self.checkpoint is not None:
+                self.checkpoint.tick(self)
+            state = self._loaded(self.frontier.get())
             if self.problem.is_goal(state):
                 return [self._reconstruct_path(state)]
-            if len(self._reconstruct_path(state)) < self.max_depth:
+            if self._path_length(state) < self.max_depth:
+                parent = self._stored(state)
                 for action in self.problem.actions(state):
                     next_state = self.problem.result(state, action)
-                    if next_state not in self.predecessors:
-                        self.predecessors[next_state] = (state, action)
-                        self.frontier.put(next_state)
+                    next_key = self._as_key(next_state)
+                    if next_key not in self.predecessors:
+                        self.predecessors[next_key] = (parent, action)
+                        self.frontier.put(self._stored(next_state, next_key))
+            yield
         return []
         
 class Dijkstra(BestFirstSearch):
-    def __init__(self, problem:SearchProblem):
+    """
+    Dijkstra class represents Dijkstra's algorithm, with f = g.
+
+    Args:
+        problem (SearchProblem): The search problem, costs must be nonnegative.
+        buckets (bool, optional): Whether the frontier is a BucketQueue, for integer costs. Defaults to False.
+    """
+    def __init__(self, problem:SearchProblem, buckets:bool=False):
         super().__init__(problem)
-        self.eval_f = lambda s: self.g_costs[s]
+        self.eval_f = lambda s, g: g
+        if buckets:
+            self._use_buckets()
         
 class GBFS(BestFirstSearch):
     def __init__(self, problem:HeuristicSearchProblem):
         super().__init__(problem)
-        self.eval_f = lambda s: self.problem.heuristic(s)
+        self.eval_f = lambda s, g: self.problem.heuristic(s)
         
 class AStar(BestFirstSearch):
-    def __init__(self, problem:HeuristicSearchProblem, weight:float|int=1):
+    """
+    AStar class represents A* search, with f = g + weight * h.
+    With lazy, the heuristic of a successor is computed only when it is popped: it is queued with the f of its
+    parent (or its g if greater), and queued again with its own f if that is greater, so the successors that are
+    never popped never have their heuristic computed. With a consistent heuristic and weight 1 the parent's f is
+    a lower bound of the successor's, and the order of the expansions is that of A*.
+
+    Args:
+        problem (HeuristicSearchProblem): The search problem.
+        weight (float|int, optional): The weight of the heuristic. Defaults to 1.
+        lazy (bool, optional): Whether to defer the heuristic of the successors until they are popped. Defaults to False.
+        buckets (bool, optional): Whether the frontier is a BucketQueue, breaking ties of f toward the least h and
+            then the last queued, for integer costs, heuristic and weight. Defaults to False.
+
+    Attributes:
+        h_values (Dict[Hashable, float]): With lazy, the heuristic of the states it was computed for.
+    """
+    def __init__(self, problem:HeuristicSearchProblem, weight:float|int=1, lazy:bool=False, buckets:bool=False):
+        super().__init__(problem)
+        self.weight = weight
+        self.lazy = lazy
+        self.h_values: Dict[Hashable, float] = {}
+        self.eval_f = lambda s, g: g + weight * self.problem.heuristic(s)
+        if buckets:
+            self._use_buckets()
+
+    def _steps(self) -> Generator[None, None, List[List[Action]]]:
+        if not self.lazy:
+            return (yield from super()._steps())
+        while not self.frontier.empty():
+            if self.checkpoint is not None:
+                self.checkpoint.tick(self)
+            priority, item = self.frontier.get()
+            state = self._loaded(item)
+            key = self._as_key(state)
+            if key not in self.h_values:
+                self.h_values[key] = self.problem.heuristic(state)
+                f = self.g_costs[key] + self.weight * self.h_values[key]
+                if f > priority:
+                    self.frontier.put((f, item))
+                    continue
+            if self.problem.is_goal(state):
+                return [self._reconstruct_path(state)]
+            self._extend(state)
+            yield
+        return []
+
+    def _extend(self, state: State) -> None:
+        if not self.lazy:
+            return super()._extend(state)
+        key = self._as_key(state)
+        parent = self._stored(state, key)
+        g = self.g_costs[key]
+        parent_f = g + self.weight * self.h_values[key]
+        for action in self.problem.actions(state):
+            next_state = self.problem.result(state, action)
+            next_key = next_state if self._key is None else self._key(next_state)
+            g_cost = g + self.problem.action_cost(state, action)
+            if next_key not in self.g_costs or g_cost < self.g_costs[next_key]:
+                self.predecessors[next_key] = (parent, action)
+                self.g_costs[next_key] = g_cost
+                h = self.h_values.get(next_key)
+                f = max(parent_f, g_cost) if h is None else g_cost + self.weight * h
+                self.frontier.put((f, self._stored(next_state, next_key)))
+
+    def _checkpoint_state(self) -> dict:
+        tables = super()._checkpoint_state()
+        if self.lazy:
+            tables["h_values"] = self.h_values
+        return tables
+
+    def _restore_state(self, tables: dict) -> None:
+        super()._restore_state(tables)
+        self.h_values = tables.get("h_values", {})
+
+class EPEAStar(BestFirstSearch):
+    """
+    EPEAStar class represents Enhanced Partial Expansion A*. An expansion generates only the successors whose f
+    is the least not generated yet, chosen from problem.action_deltas without generating the others, and queues
+    the node again with the f of its next successors if any are left. Override action_deltas with a direct
+    computation for the successors never needed to cost nothing; the default still keeps them out of the frontier.
+    The path found is optimal if the heuristic is consistent.
+
+    Args:
+        problem (HeuristicSearchProblem): The search problem.
+
+    Attributes:
+        generated (int): The number of successors generated by the partial expansions of the last search, queued or not
+            by their g. It leaves out the children that the default action_deltas builds to compute their change of f.
+    """
+    def __init__(self, problem:HeuristicSearchProblem):
         super().__init__(problem)
-        self.eval_f = lambda s: self.g_costs[s] + weight * self.problem.heuristic(s)
\ No newline at end of file
+        self.eval_f = lambda s, g: g + self.problem.heuristic(s)
+        self.generated = 0
+        # the greatest change of f generated so far of the nodes partially expanded
+        self._deltas: Dict[Hashable, float] = {}
+
+    def _steps(self) -> Generator[None, None, List[List[Action]]]:
+        while not self.frontier.empty():
+            if self.checkpoint is not None:
+                self.checkpoint.tick(self)
+            priority, item = self.frontier.get()
+            state = self._loaded(item)
+            if self.problem.is_goal(state):
+                return [self._reconstruct_path(state)]
+            self._extend(state, priority)
+            yield
+        return []
+
+    def _extend(self, state: State, priority: float = -math.inf) -> None:
+        key = self._as_key(state)
+        parent = self._stored(state, key)
+        done = self._deltas.get(key, -math.inf)
+        deltas = [(action, delta) for action, delta in self.problem.action_deltas(state) if delta > done]
+        if not deltas:
+            self._deltas.pop(key, None)
+            return
+        current = min(delta for _, delta in deltas)
+        g = self.g_costs[key]
+        f = g + self.problem.heuristic(state)
+        # an entry popped before its next successors are due, e.g. the initial state or a node queued again
+        # by a cheaper path, goes back to the frontier with their f rather than generating them early
+        if f + current > priority:
+            self.frontier.put((f + current, parent))
+            return
+        self._deltas.pop(key, None)
+        for action, delta in deltas:
+            if delta != current:
+                continue
+            next_state = self.problem.result(state, action)
+            self.generated += 1
+            next_key = next_state if self._key is None else self._key(next_state)
+            g_cost = g + self.problem.action_cost(state, action)
+            if next_key not in self.g_costs or g_cost < self.g_costs[next_key]:
+                self.predecessors[next_key] = (parent, action)
+                self.g_costs[next_key] = g_cost
+                # a node reached more cheaply is expanded again from its first successors
+                self._deltas.pop(next_key, None)
+                self.frontier.put((f + delta, self._stored(next_state, next_key)))
+        rest = min((delta for _, delta in deltas if delta > current), default=None)
+        if rest is not None:
+            self._deltas[key] = current
+            self.frontier.put((f + rest, parent))
+
+    def _checkpoint_state(self) -> dict:
+        tables = super()._checkpoint_state()
+        tables["deltas"] = self._deltas
+        return tables
+
+    def _restore_state(self, tables: dict) -> None:
+        super()._restore_state(tables)
+        self._deltas = tables["deltas"]
+
+class _SMANode:
+    """A node of the SMA* tree: pending maps the indices of the actions without a child in memory to the f of
+    their forgotten child, or None if it was never generated."""
+    __slots__ = ("state", "parent", "action", "index", "g", "f", "depth", "goal", "actions", "children", "pending", "alive")
+
+    def __init__(self, state: State, parent: "_SMANode|None", action: Action, index: int, g: float, depth: int,
+                 goal: bool, actions: list) -> None:
+        self.state = state
+        self.parent = parent
+        self.action = action
+        self.index = index
+        self.g = g
+        self.f = math.inf
+        self.depth = depth
+        self.goal = goal
+        self.actions = actions
+        self.children: List["_SMANode"] = []
+        self.pending: Dict[int, float|None] = dict.fromkeys(range(len(actions)))
+        self.alive = True
+
+class SMAStar(Search):
+    """
+    SMAStar class represents Simplified Memory-bounded A*: a tree search that keeps at most max_nodes nodes. It expands
+    the deepest node of least f one successor at a time, and when memory is full it forgets the shallowest leaf
+    of greatest f, backing its f up into its parent, which regenerates it if that f becomes the least again.
+    A successor is pruned if its state is held by a node in memory with a cost as low.
+    The path found is optimal if the optimal path fits in max_nodes nodes and the heuristic is admissible.
+
+    Args:
+        problem (HeuristicSearchProblem): The search problem.
+        max_nodes (int, optional): The most nodes held in memory. Defaults to 100000.
+
+    Attributes:
+        generated (int): The number of nodes generated by the last search, regenerations included.
+        cost (float): The cost of the path found, inf if there is none.
+
+    Methods:
+        search(): Return the optimal path from the initial state to a goal that fits in memory.
+    """
+    def __init__(self, problem: HeuristicSearchProblem, max_nodes: int = 100000) -> None:
+        if max_nodes < 2:
+            raise ValueError("max_nodes must be at least 2")
+        self.problem = problem
+        self.max_nodes = max_nodes
+        self.generated = 0
+        self.cost = math.inf
+
+    def search(self) -> List[List[Action]]:
+        init = self.problem.initial_state()
+        root = self._node(init, None, Action.STAY, -1, 0)
+        root.f = self.problem.heuristic(init) if root.pending or root.goal else math.inf
+        self._counter = count()
+        self._open: list = []
+        self._leaves: list = []
+        self._size = 1
+        self.generated = 1
+        self.cost = math.inf
+        self._nodes: Dict[State, _SMANode] = {init: root}
+        self._push(root)
+        while True:
+            best = self._best()
+            if best is None:
+                return []
+            if best.goal:
+                self.cost = best.g
+                return [self._reconstruct_path(best)]
+            self._generate(best)
+
+    def _node(self, state: State, parent: _SMANode|None, action: Action, index: int, g: float) -> _SMANode:
+        goal = self.problem.is_goal(state)
+        depth = 0 if parent is None else parent.depth + 1
+        return _SMANode(state, parent, action, index, g, depth, goal, list(self.problem.actions(state)))
+
+    def _push(self, node: _SMANode) -> None:
+        """Queue the node with its current f in the heaps it belongs to, the outdated entries are skipped later."""
+        priority = self._priority(node)
+        if priority < math.inf:
+            heapq.heappush(self._open, (priority, -node.depth, next(self._counter), node))
+        if not node.children and node.parent is not None:
+            heapq.heappush(self._leaves, (-node.f, node.depth, next(self._counter), node))
+        if len(self._open) + len(self._leaves) > 8 * self.max_nodes:
+            self._compact()
+
+    def _compact(self) -> None:
+        self._open = [entry for entry in self._open if self._is_open(entry)]
+        self._leaves = [entry for entry in self._leaves if self._is_leaf(entry)]
+        heapq.heapify(self._open)
+        heapq.heapify(self._leaves)
+
+    @staticmethod
+    def _priority(node: _SMANode) -> float:
+        """Return the f of the next successor of the node: its own f for a new one, else that of the best forgotten one."""
+        if node.goal:
+            return node.f
+        if any(f is None for f in node.pending.values()):
+            return node.f
+        return min(node.pending.values(), default=math.inf)
+
+    def _is_open(self, entry: tuple) -> bool:
+        node = entry[3]
+        return node.alive and self._priority(node) == entry[0]
+
+    @staticmethod
+    def _is_leaf(entry: tuple) -> bool:
+        node = entry[3]
+        return node.alive and node.f == -entry[0] and not node.children
+
+    def _best(self) -> _SMANode|None:
+        while self._open and not self._is_open(self._open[0]):
+            heapq.heappop(self._open)
+        return self._open[0][3] if self._open else None
+
+    def _generate(self, node: _SMANode) -> None:
+        """Generate the next successor of the node, a new one first, then the forgotten one of least f."""
+        new = [i for i, f in node.pending.items() if f is None]
+        index = new[0] if new else min(node.pending, key=node.pending.get)
+        forgotten = node.pending.pop(index)
+        action = node.actions[index]
+        state = self.problem.result(node.state, action)
+        if self._size >= self.max_nodes:
+            self._forget(node)
+        g = node.g + self.problem.action_cost(node.state, action)
+        other = self._nodes.get(state)
+        if other is not None and other.g <= g:
+            # a path at least as cheap to the state is in memory, or backed up in an ancestor of it once forgotten
+            pass
+        elif self._size >= self.max_nodes:
+            # the path to the node fills the memory, so no path through this successor fits
+            node.pending[index] = math.inf
+        else:
+            child = self._node(state, node, action, index, g)
+            self._nodes[state] = child
+            self.generated += 1
+            if child.pending or child.goal:
+                child.f = max(node.f, child.g + self.problem.heuristic(state), forgotten or 0)
+            node.children.append(child)
+            self._size += 1
+            self._push(child)
+        self._backup(node)
+        if node.alive:
+            self._push(node)
+
+    def _forget(self, keep: _SMANode) -> None:
+        """Drop the shallowest leaf of greatest f other than keep, and remember its f in its parent."""
+        skipped = []
+        while self._leaves:
+            entry = heapq.heappop(self._leaves)
+            if not self._is_leaf(entry):
+                continue
+            leaf = entry[3]
+            if leaf is keep:
+                skipped.append(entry)
+                continue
+            parent = leaf.parent
+            parent.children.remove(leaf)
+            parent.pending[leaf.index] = leaf.f
+            leaf.alive = False
+            if self._nodes.get(leaf.state) is leaf:
+                del self._nodes[leaf.state]
+            self._size -= 1
+            self._push(parent)
+            break
+        for entry in skipped:
+            heapq.heappush(self._leaves, entry)
+
+    def _backup(self, node: _SMANode|None) -> None:
+        """Set the f of the fully generated nodes to the least f of their successors, up the tree while it changes."""
+        while node is not None:
+            if any(f is None for f in node.pending.values()):
+                return
+            f = min([child.f for child in node.children] + list(node.pending.values()), default=math.inf)
+            if node.goal:
+                f = min(f, node.g)
+            if f == node.f:
+                return
+            node.f = f
+            self._push(node)
+            node = node.parent
+
+    def _reconstruct_path(self, node: _SMANode) -> List[Action]:
+        actions = []
+        while node is not None:
+            actions.append(node.action)
+            node = node.parent
+        actions.reverse()
+        return actions
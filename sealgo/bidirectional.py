@@ -1,4 +1,4 @@
-from typing import List, Type
+from typing import Generator, List, Type
 from queue import PriorityQueue
 from copy import copy
 import os
@@ -43,6 +43,7 @@ class BiDirectional(Search):
     Methods:
         search(): Perform the bidirectional search and return the path from the initial state to the goal state.
         _init_problem(problem: BiSearchProblem): Initialize the forward and backward search problems.
+        _checkpoint_state(): Return the tables of both searches for a checkpoint, see sealgo.checkpoint.
         _reconstruct_path(inter_state: State): Reconstruct the path from the initial state to the goal state.
 
     """
@@ -67,8 +68,13 @@ class BiDirectional(Search):
             List[List[Action]]: The path from the initial state to the goal state.
 
         """
+        return self._run(self._steps())
+
+    def _steps(self) -> Generator[None, None, List[List[Action]]]:
         b_times = 0
         while not self.f_algo.frontier.empty() and not self.b_algo.frontier.empty():
+            if self.checkpoint is not None:
+                self.checkpoint.tick(self)
             if b_times >= self.b_weight:
                 b_times = 0
                 # forward search
@@ -80,8 +86,19 @@ class BiDirectional(Search):
                 return [self._reconstruct_path(b_state)]
             self.b_algo._extend(b_state)
             b_times += 1
+            yield
         return []
 
+    def _checkpoint_state(self) -> dict:
+        """Return the tables of both searches, prefixed by f_ and b_."""
+        tables = {"f_" + name: table for name, table in self.f_algo._checkpoint_state().items()}
+        tables.update(("b_" + name, table) for name, table in self.b_algo._checkpoint_state().items())
+        return tables
+
+    def _restore_state(self, tables: dict) -> None:
+        self.f_algo._restore_state({name[2:]: table for name, table in tables.items() if name.startswith("f_")})
+        self.b_algo._restore_state({name[2:]: table for name, table in tables.items() if name.startswith("b_")})
+
     def _init_problem(self, problem: BiSearchProblem) -> None:
         """
         Initialize the forward and backward search problems.
@@ -106,6 +123,11 @@ class BiDirectional(Search):
             f_problem.heuristic = problem.heuristic
         if hasattr(problem, "re_heuristic"):
             b_problem.heuristic = problem.re_heuristic
+        # the two half paths are joined on the exact meeting state, so states are not canonicalized or encoded
+        f_problem.symmetric = False
+        b_problem.symmetric = False
+        f_problem.compact = False
+        b_problem.compact = False
         self.f_problem = f_problem
         self.b_problem = b_problem
     
@@ -0,0 +1,127 @@
+import os
+import gzip
+import time
+import pickle
+from collections import deque
+from collections.abc import Iterator
+from itertools import islice
+from typing import Any, Dict, Iterable
+
+from .search import Search
+
+_MAGIC = b"SEALGO-CHECKPOINT-1\n"
+_CHUNK = 1 << 14
+
+class Interrupted(Exception):
+    """Raised by Checkpointer.tick after saving, when a stop was requested."""
+
+def _open(path: str, mode: str, compress: bool):
+    return gzip.open(path, mode, compresslevel=1) if compress else open(path, mode, buffering=1 << 20)
+
+def _chunks(items: Iterable) -> Iterator[list]:
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, _CHUNK))
+        if not chunk:
+            return
+        yield chunk
+
+def save_checkpoint(search: Search, path: str, compress: bool = False) -> None:
+    """
+    Save the state of a search to a file, written to path + ".tmp" first and moved over path once complete,
+    so a crash while saving keeps the previous checkpoint. The tables are streamed in pickled chunks of
+    at most 16384 entries, never pickled as one object.
+    """
+    tables: Dict[str, Any] = search._checkpoint_state()
+    with _open(path + ".tmp", "wb", compress) as file:
+        file.write(_MAGIC)
+        pickle.dump(type(search).__qualname__, file)
+        for name, value in tables.items():
+            if isinstance(value, dict):
+                kind, items = "dict", value.items()
+            elif isinstance(value, deque):
+                kind, items = "deque", value
+            elif isinstance(value, (list, Iterator)):
+                kind, items = "list", value
+            else:
+                pickle.dump(("value", name, value), file, pickle.HIGHEST_PROTOCOL)
+                continue
+            pickle.dump((kind, name, None), file, pickle.HIGHEST_PROTOCOL)
+            for chunk in _chunks(items):
+                pickle.dump(chunk, file, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(None, file)
+        pickle.dump(("end", None, None), file)
+    os.replace(path + ".tmp", path)
+
+def load_checkpoint(search: Search, path: str) -> Search:
+    """
+    Restore the state saved by save_checkpoint into a search built with the same problem and arguments,
+    and return it, so its search() goes on from where the checkpoint was taken.
+    """
+    with open(path, "rb") as probe:
+        compress = probe.read(2) == b"\x1f\x8b"
+    with _open(path, "rb", compress) as file:
+        if file.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError(f"{path} is not a checkpoint")
+        name = pickle.load(file)
+        if name != type(search).__qualname__:
+            raise ValueError(f"The checkpoint is of a {name}, not of a {type(search).__qualname__}")
+        tables: Dict[str, Any] = {}
+        while True:
+            kind, key, value = pickle.load(file)
+            if kind == "end":
+                break
+            if kind == "value":
+                tables[key] = value
+                continue
+            table: Any = {} if kind == "dict" else deque() if kind == "deque" else []
+            add = table.update if kind == "dict" else table.extend
+            while (chunk := pickle.load(file)) is not None:
+                add(chunk)
+            tables[key] = table
+    search._restore_state(tables)
+    return search
+
+class Checkpointer:
+    """
+    Checkpointer class saves the state of a search periodically or on request. Set it as the checkpoint
+    attribute of a search; the engines that support checkpoints (BestFirstSearch and its subclasses,
+    BiDirectional and MCTS) call tick at the points where their state is consistent.
+    request is safe to call from a signal handler, e.g. on SIGTERM before a machine is preempted.
+
+    Args:
+        path (str): The file of the checkpoint.
+        interval (float|None, optional): The seconds between two checkpoints, None to save only on request. Defaults to 600.
+        compress (bool, optional): Whether to gzip the file. Defaults to False.
+
+    Methods:
+        tick(search: Search): Save the search if the interval elapsed or a checkpoint was requested.
+        request(stop: bool): Save at the next tick, and raise Interrupted after saving if stop.
+        save(search: Search): Save the search now.
+    """
+    def __init__(self, path: str, interval: float|None = 600, compress: bool = False) -> None:
+        self.path = path
+        self.interval = interval
+        self.compress = compress
+        self._calls = 0
+        self._requested = False
+        self._stop = False
+        self._next = time.monotonic() + (interval or 0)
+
+    def tick(self, search: Search) -> None:
+        self._calls += 1
+        due = self.interval is not None and self._calls & 1023 == 0 and time.monotonic() >= self._next
+        if due or self._requested:
+            self.save(search)
+            if self._stop:
+                self._stop = False
+                raise Interrupted(self.path)
+
+    def request(self, stop: bool = False) -> None:
+        self._requested = True
+        self._stop = self._stop or stop
+
+    def save(self, search: Search) -> None:
+        save_checkpoint(search, self.path, self.compress)
+        self._requested = False
+        self._next = time.monotonic() + (self.interval or 0)
@@ -0,0 +1,279 @@
+import os
+import heapq
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from .search import Search
+from .problem import State, Action
+from .graph import CompiledGraph
+from .csr import items
+
+class ContractionHierarchy:
+    """
+    ContractionHierarchy class preprocesses a CompiledGraph for fast shortest-path queries. The states are contracted
+    one by one in the order of their edge difference, and a shortcut u -> w is inserted for every path u -> v -> w
+    through the contracted state v that no other path (a witness) makes redundant. A query is then a bidirectional
+    search that only climbs to states contracted later, see CHSearch.
+
+    Args:
+        graph (CompiledGraph): The compiled graph, weights must be nonnegative.
+        witness_limit (int, optional): The most states a witness search settles before giving up
+            and inserting the shortcut, which is always correct. Defaults to 64.
+
+    Attributes:
+        rank (np.ndarray): The contraction order of every state.
+        sources, targets, weights (np.ndarray): The source, target and weight of every edge of the hierarchy.
+        originals (np.ndarray): The edge of the graph of every original edge, -1 for shortcuts.
+        firsts, seconds (np.ndarray): The two hierarchy edges a shortcut stands for, -1 for original edges.
+        up_indptr, up_edges (np.ndarray): The edges from every state to states of higher rank.
+        down_indptr, down_edges (np.ndarray): The edges into every state from states of higher rank.
+
+    Methods:
+        build(graph: CompiledGraph, witness_limit: int) -> ContractionHierarchy: Contract the graph.
+        save(path: str): Save the graph and the hierarchy into a directory.
+        load(path: str, mmap: bool): Load a saved hierarchy, the arrays memory-mapped read-only by default.
+        unpack(edges: Iterable[int]) -> List[int]: Return the edges of the graph that hierarchy edges stand for.
+    """
+    _ARRAYS = ("rank", "sources", "targets", "weights", "originals", "firsts", "seconds",
+               "up_indptr", "up_edges", "down_indptr", "down_edges")
+
+    def __init__(self, graph: CompiledGraph, **arrays: np.ndarray) -> None:
+        self.graph = graph
+        for name in self._ARRAYS:
+            setattr(self, name, arrays[name])
+
+    @classmethod
+    def build(cls, graph: CompiledGraph, witness_limit: int = 64) -> "ContractionHierarchy":
+        return _Contractor(graph, witness_limit).run()
+
+    def save(self, path: str) -> None:
+        """Save the graph and the arrays of the hierarchy as ch_*.npy files into the directory path."""
+        self.graph.save(path)
+        for name in self._ARRAYS:
+            np.save(os.path.join(path, f"ch_{name}.npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "ContractionHierarchy":
+        mode = "r" if mmap else None
+        arrays = {name: np.load(os.path.join(path, f"ch_{name}.npy"), mmap_mode=mode) for name in cls._ARRAYS}
+        return cls(CompiledGraph.load(path, mmap), **arrays)
+
+    def unpack(self, edges: Iterable[int]) -> List[int]:
+        """Return the edges of the graph that the given hierarchy edges stand for, in order."""
+        path = []
+        stack = list(edges)
+        stack.reverse()
+        while stack:
+            edge = stack.pop()
+            original = int(self.originals[edge])
+            if original >= 0:
+                path.append(original)
+            else:
+                stack.append(int(self.seconds[edge]))
+                stack.append(int(self.firsts[edge]))
+        return path
+
+class _Contractor:
+    """The state of the preprocessing: the remaining graph as dicts of the best edge between two states."""
+    def __init__(self, graph: CompiledGraph, witness_limit: int) -> None:
+        self.graph = graph
+        self.witness_limit = witness_limit
+        n = len(graph)
+        self.out: List[Dict[int, int]] = [{} for _ in range(n)]
+        self.into: List[Dict[int, int]] = [{} for _ in range(n)]
+        self.sources: List[int] = []
+        self.targets: List[int] = []
+        self.weights: List[float] = []
+        self.originals: List[int] = []
+        self.firsts: List[int] = []
+        self.seconds: List[int] = []
+        self.contracted = [False] * n
+        self.deleted = [0] * n
+        # the whole graph is read once, copied to lists only for the time of the preprocessing
+        indptr, indices, weights = graph.indptr.tolist(), graph.indices.tolist(), graph.weights.tolist()
+        for u in range(n):
+            for e in range(indptr[u], indptr[u + 1]):
+                v = indices[e]
+                if v != u:
+                    self._add_edge(u, v, weights[e], e, -1, -1)
+
+    def _add_edge(self, u: int, v: int, weight: float, original: int, first: int, second: int) -> None:
+        edge = self.out[u].get(v)
+        if edge is not None and self.weights[edge] <= weight:
+            return
+        edge = len(self.weights)
+        self.sources.append(u)
+        self.targets.append(v)
+        self.weights.append(weight)
+        self.originals.append(original)
+        self.firsts.append(first)
+        self.seconds.append(second)
+        self.out[u][v] = edge
+        self.into[v][u] = edge
+
+    def _witness(self, u: int, v: int, max_dist: float) -> Dict[int, float]:
+        """Run Dijkstra from u among the states not contracted yet, avoiding v, up to max_dist or witness_limit settled states."""
+        distances = {u: 0.0}
+        frontier = [(0.0, u)]
+        settled = 0
+        contracted, weights = self.contracted, self.weights
+        while frontier and settled < self.witness_limit:
+            d, x = heapq.heappop(frontier)
+            if d > distances[x]:
+                continue
+            if d > max_dist:
+                break
+            settled += 1
+            for y, edge in self.out[x].items():
+                if y == v or contracted[y]:
+                    continue
+                d_y = d + weights[edge]
+                if d_y < distances.get(y, float("inf")):
+                    distances[y] = d_y
+                    heapq.heappush(frontier, (d_y, y))
+        return distances
+
+    def _shortcuts(self, v: int) -> List[Tuple[int, int, float, int, int]]:
+        """Return the shortcuts (u, w, weight, first, second) that contracting v needs."""
+        shortcuts = []
+        contracted, weights = self.contracted, self.weights
+        outs = [(w, edge) for w, edge in self.out[v].items() if not contracted[w]]
+        if not outs:
+            return shortcuts
+        for u, in_edge in self.into[v].items():
+            if contracted[u]:
+                continue
+            to_v = weights[in_edge]
+            max_dist = to_v + max(weights[edge] for _, edge in outs)
+            distances = self._witness(u, v, max_dist)
+            for w, out_edge in outs:
+                if w == u:
+                    continue
+                through_v = to_v + weights[out_edge]
+                if distances.get(w, float("inf")) > through_v:
+                    shortcuts.append((u, w, through_v, in_edge, out_edge))
+        return shortcuts
+
+    def _priority(self, v: int) -> int:
+        degree = sum(not self.contracted[u] for u in self.into[v]) + sum(not self.contracted[w] for w in self.out[v])
+        return len(self._shortcuts(v)) - degree + self.deleted[v]
+
+    def run(self) -> ContractionHierarchy:
+        n = len(self.graph)
+        queue = [(self._priority(v), v) for v in range(n)]
+        heapq.heapify(queue)
+        rank = np.zeros(n, dtype=np.int64)
+        order = 0
+        while queue:
+            _, v = heapq.heappop(queue)
+            # lazy update: the priority is recomputed and v is contracted only if it is still the least
+            priority = self._priority(v)
+            if queue and priority > queue[0][0]:
+                heapq.heappush(queue, (priority, v))
+                continue
+            for u, w, weight, first, second in self._shortcuts(v):
+                self._add_edge(u, w, weight, -1, first, second)
+            self.contracted[v] = True
+            rank[v] = order
+            order += 1
+            for x in list(self.into[v]) + list(self.out[v]):
+                self.deleted[x] += 1
+        return self._finish(rank)
+
+    def _finish(self, rank: np.ndarray) -> ContractionHierarchy:
+        # only the best edge between two states is kept, those replaced by shorter shortcuts are dropped
+        kept = np.array(sorted(edge for out in self.out for edge in out.values()), dtype=np.int64)
+        sources = np.array(self.sources, dtype=np.int64)
+        targets = np.array(self.targets, dtype=np.int64)
+        n = len(rank)
+        up = kept[rank[targets[kept]] > rank[sources[kept]]]
+        down = kept[rank[sources[kept]] > rank[targets[kept]]]
+        up_edges = up[np.argsort(sources[up], kind="stable")]
+        down_edges = down[np.argsort(targets[down], kind="stable")]
+        up_indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources[up], minlength=n), out=up_indptr[1:])
+        down_indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(targets[down], minlength=n), out=down_indptr[1:])
+        return ContractionHierarchy(self.graph, rank=rank, sources=sources, targets=targets,
+                                    weights=np.array(self.weights, dtype=np.float64),
+                                    originals=np.array(self.originals, dtype=np.int64),
+                                    firsts=np.array(self.firsts, dtype=np.int64), seconds=np.array(self.seconds, dtype=np.int64),
+                                    up_indptr=up_indptr, up_edges=up_edges, down_indptr=down_indptr, down_edges=down_edges)
+
+class CHSearch(Search):
+    """
+    CHSearch class answers a shortest-path query on a ContractionHierarchy, as a bidirectional Dijkstra like BiDirectional
+    where both searches only follow edges to states of higher rank. The shortcuts of the best path are unpacked.
+    The arrays are read one item at a time through plain ndarray views, so a memory-mapped hierarchy is never copied.
+
+    Args:
+        hierarchy (ContractionHierarchy): The preprocessed hierarchy.
+        source (State|int|None, optional): The state to search from, or its ID, see CompiledGraph.id. Defaults to the initial state.
+        goal (State|int|None, optional): The state to reach, or its ID. Defaults to all goal states of the compiled problem.
+
+    Attributes:
+        cost (float): The cost of the path found, inf if there is none.
+        settled (int): The number of states settled by both searches.
+    """
+    def __init__(self, hierarchy: ContractionHierarchy, source: State|int|None = None, goal: State|int|None = None) -> None:
+        self.hierarchy = hierarchy
+        self.problem = hierarchy.graph
+        graph = hierarchy.graph
+        self.source = 0 if source is None else graph.id(source)
+        self.goals = np.flatnonzero(graph.goals).tolist() if goal is None else [graph.id(goal)]
+        self.cost = float("inf")
+        self.settled = 0
+
+    def search(self) -> List[List[Action]]:
+        hierarchy = self.hierarchy
+        weights, up_indptr, up_edges, down_indptr, down_edges, sources, targets = (items(getattr(hierarchy, name)) for name in
+            ("weights", "up_indptr", "up_edges", "down_indptr", "down_edges", "sources", "targets"))
+        inf = float("inf")
+        f_dist, b_dist = {self.source: 0.0}, {goal: 0.0 for goal in self.goals}
+        f_parent, b_parent = {self.source: -1}, {goal: -1 for goal in self.goals}
+        f_frontier, b_frontier = [(0.0, self.source)], [(0.0, goal) for goal in self.goals]
+        heapq.heapify(b_frontier)
+        best, meeting = inf, None
+        self.settled = 0
+        while True:
+            f_min = f_frontier[0][0] if f_frontier else inf
+            b_min = b_frontier[0][0] if b_frontier else inf
+            # a search stops once its frontier cannot improve the best path met
+            if min(f_min, b_min) >= best:
+                break
+            forward = f_min <= b_min
+            if forward:
+                frontier, dist, parent, other = f_frontier, f_dist, f_parent, b_dist
+                indptr, edges, ends = up_indptr, up_edges, targets
+            else:
+                frontier, dist, parent, other = b_frontier, b_dist, b_parent, f_dist
+                indptr, edges, ends = down_indptr, down_edges, sources
+            d, u = heapq.heappop(frontier)
+            if d > dist[u]:
+                continue
+            self.settled += 1
+            if u in other and d + other[u] < best:
+                best, meeting = d + other[u], u
+            for i in range(indptr(u), indptr(u + 1)):
+                edge = edges(i)
+                v = ends(edge)
+                d_v = d + weights(edge)
+                if d_v < dist.get(v, inf):
+                    dist[v] = d_v
+                    parent[v] = edge
+                    heapq.heappush(frontier, (d_v, v))
+        self.cost = best
+        if meeting is None:
+            return []
+        edges = []
+        u = meeting
+        while f_parent[u] >= 0:
+            edges.append(f_parent[u])
+            u = sources(f_parent[u])
+        edges.reverse()
+        u = meeting
+        while b_parent[u] >= 0:
+            edges.append(b_parent[u])
+            u = targets(b_parent[u])
+        return [self.hierarchy.graph.path(self.hierarchy.unpack(edges))]
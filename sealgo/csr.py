@@ -0,0 +1,19 @@
+from typing import Callable, Tuple
+
+import numpy as np
+
+def gather(indptr: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the indptr of the CSR sub-matrix made of the given rows, and the positions of its entries in the full matrix."""
+    starts = indptr[rows]
+    counts = indptr[rows + 1] - starts
+    sub_indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(counts, out=sub_indptr[1:])
+    entries = np.repeat(starts - sub_indptr[:-1], counts) + np.arange(sub_indptr[-1], dtype=np.int64)
+    return sub_indptr, entries
+
+def items(array: np.ndarray) -> Callable[[int], int|float|bool]:
+    """
+    Return a function reading one item of the array as a Python scalar, about as fast as indexing a list.
+    It reads a plain view of a memory-mapped array, so the array is never copied into the process.
+    """
+    return array.view(np.ndarray).item
@@ -0,0 +1,41 @@
+from math import factorial
+from typing import Iterable, Sequence, Tuple
+
+def pack_ints(values: Iterable[int], bits: int) -> int:
+    """Pack small nonnegative integers into one int, bits bits each, the first value in the lowest bits."""
+    key = 0
+    shift = 0
+    for value in values:
+        if value >> bits:
+            raise ValueError(f"{value} does not fit in {bits} bits")
+        key |= value << shift
+        shift += bits
+    return key
+
+def unpack_ints(key: int, n: int, bits: int) -> Tuple[int, ...]:
+    """Return the n integers packed into key by pack_ints."""
+    mask = (1 << bits) - 1
+    return tuple((key >> (i * bits)) & mask for i in range(n))
+
+def rank_permutation(permutation: Sequence[int]) -> int:
+    """Return the rank of a permutation of 0..n-1 in lexicographic order, from 0 to n! - 1."""
+    n = len(permutation)
+    rank = 0
+    used = 0
+    for i, value in enumerate(permutation):
+        # the number of unused values less than value, as a bit count of the used set
+        smaller = value - bin(used & ((1 << value) - 1)).count("1")
+        rank += smaller * factorial(n - 1 - i)
+        used |= 1 << value
+    return rank
+
+def unrank_permutation(rank: int, n: int) -> Tuple[int, ...]:
+    """Return the permutation of 0..n-1 of the given lexicographic rank, the inverse of rank_permutation."""
+    if not 0 <= rank < factorial(n):
+        raise ValueError(f"Rank {rank} is out of range for n = {n}")
+    values = list(range(n))
+    permutation = []
+    for i in range(n - 1, -1, -1):
+        index, rank = divmod(rank, factorial(i))
+        permutation.append(values.pop(index))
+    return tuple(permutation)
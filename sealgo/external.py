@@ -0,0 +1,335 @@
+import os
+import math
+import heapq
+import pickle
+import shutil
+import struct
+import tempfile
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from .search import Search
+from .problem import SearchProblem, HeuristicSearchProblem, State, Action
+
+_LENGTH = struct.Struct("<I")
+_COST = struct.Struct("<d")
+
+def _write_records(path: str, records: Iterable[bytes]) -> int:
+    """Write the records to the file as length-prefixed bytes, return how many there were."""
+    n = 0
+    with open(path, "wb", buffering=1 << 20) as file:
+        for record in records:
+            file.write(_LENGTH.pack(len(record)))
+            file.write(record)
+            n += 1
+    return n
+
+def _read_records(path: str) -> Iterator[bytes]:
+    with open(path, "rb", buffering=1 << 20) as file:
+        while True:
+            head = file.read(_LENGTH.size)
+            if not head:
+                return
+            yield file.read(_LENGTH.unpack(head)[0])
+
+def _unique(records: Iterable[bytes], key: Callable[[bytes], bytes]|None = None) -> Iterator[bytes]:
+    """Keep the first record of every key in a stream sorted by key."""
+    last = None
+    for record in records:
+        k = record if key is None else key(record)
+        if k != last:
+            yield record
+            last = k
+
+def _subtract(records: Iterable[bytes], removed: Iterable[bytes], key: Callable[[bytes], bytes]|None = None) -> Iterator[bytes]:
+    """Yield the records of a stream sorted by key whose key is not in another sorted stream, by merging them."""
+    removed = iter(removed)
+    other = next(removed, None)
+    for record in records:
+        k = record if key is None else key(record)
+        while other is not None and other < k:
+            other = next(removed, None)
+        if k != other:
+            yield record
+
+class _SortedRuns:
+    """
+    The records written by an expansion step: they are kept in memory up to a number of records, then sorted and
+    spilled to a run file, and all runs are read back merged into one sorted stream.
+    """
+    def __init__(self, directory: str, memory: int, key: Callable[[bytes], bytes]|None = None) -> None:
+        self.directory = directory
+        self.memory = memory
+        self.key = key
+        self.buffer: List[bytes] = []
+        self.runs: List[str] = []
+
+    def add(self, record: bytes) -> None:
+        self.buffer.append(record)
+        if len(self.buffer) >= self.memory:
+            self._spill()
+
+    def _spill(self) -> None:
+        self.buffer.sort(key=self.key)
+        fd, path = tempfile.mkstemp(suffix=".run", dir=self.directory)
+        os.close(fd)
+        _write_records(path, self.buffer)
+        self.runs.append(path)
+        self.buffer = []
+
+    def merged(self) -> Iterator[bytes]:
+        """Yield all the records sorted, and remove the run files once read."""
+        self.buffer.sort(key=self.key)
+        try:
+            yield from heapq.merge(self.buffer, *(_read_records(run) for run in self.runs), key=self.key)
+        finally:
+            for run in self.runs:
+                os.remove(run)
+            self.runs, self.buffer = [], []
+
+class _ExternalSearch(Search):
+    """
+    The files of an external-memory search: a working directory, temporary unless given, and the encoding of
+    the states into bytes. Equal states must have equal encodings, as duplicates are detected on the bytes, so there is
+    no generic default: pickle.dumps is not canonical, e.g. for equal frozensets or dicts built in another order.
+    Without an encoder, the compact key of a compact problem is used, pickled, which is canonical for an int or bytes.
+    """
+    def __init__(self, problem: SearchProblem, directory: str|None, memory: int,
+                 encode: Callable[[State], bytes]|None, decode: Callable[[bytes], State]|None) -> None:
+        if encode is None or decode is None:
+            if encode is not None or decode is not None:
+                raise ValueError("encode and decode must be given together")
+            if not getattr(problem, "compact", False):
+                raise ValueError("An encode and a decode function are needed unless the problem is compact")
+            encode = lambda state: pickle.dumps(problem.encode(state))
+            decode = lambda data: problem.decode(pickle.loads(data))
+        self.problem = problem
+        self.directory = directory
+        self.memory = memory
+        self.encode = encode
+        self.decode = decode
+        self._dir: str|None = None
+
+    def _open(self) -> str:
+        if self.directory is None:
+            self._dir = tempfile.mkdtemp(prefix="sealgo-")
+        else:
+            os.makedirs(self.directory, exist_ok=True)
+            self._dir = self.directory
+        return self._dir
+
+    def _close(self) -> None:
+        if self.directory is None and self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+    def _action_to(self, state: State, target: bytes) -> Tuple[Action, float]|None:
+        """Return the action from state to the state encoded as target and its cost, or None."""
+        for action in self.problem.actions(state):
+            if self.encode(self.problem.result(state, action)) == target:
+                return action, self.problem.action_cost(state, action)
+        return None
+
+class ExternalBFS(_ExternalSearch):
+    """
+    ExternalBFS class represents external-memory breadth-first search with delayed duplicate detection: every layer
+    is a file of sorted unique state encodings, the successors of a layer are sorted in runs of bounded size, merged,
+    and the states of the previous layers are removed by merging with their files, so only a run is held in memory.
+    The path is rebuilt by scanning the layers backwards for a parent of the state found.
+
+    Args:
+        problem (SearchProblem): The search problem.
+        directory (str|None, optional): The directory of the layer files, kept after the search if given,
+            otherwise a temporary directory removed after the search. Defaults to None.
+        memory (int, optional): The most successors held in memory before a sorted run is written. Defaults to 1 << 20.
+        encode (Callable[[State], bytes], optional): The compact encoding of a state, equal for equal states.
+            Defaults to the pickled problem.encode, required if the problem is not compact.
+        decode (Callable[[bytes], State], optional): The inverse of encode. Defaults to the inverse of the default encode.
+        locality (int|None, optional): The number of previous layers a successor can be in, 2 for undirected graphs.
+            Defaults to None, all previous layers are checked.
+
+    Attributes:
+        layer_sizes (List[int]): The number of states at every depth reached by the last search.
+
+    Methods:
+        search(): Return the shortest path to a goal, or [] after enumerating all the reachable states.
+        layer(depth: int) -> Iterator[State]: Yield the states at the given depth, if the directory was given.
+    """
+    def __init__(self, problem: SearchProblem, directory: str|None = None, memory: int = 1 << 20,
+                 encode: Callable[[State], bytes]|None = None, decode: Callable[[bytes], State]|None = None,
+                 locality: int|None = None) -> None:
+        super().__init__(problem, directory, memory, encode, decode)
+        self.locality = locality
+        self.layer_sizes: List[int] = []
+
+    def _layer_path(self, depth: int) -> str:
+        return os.path.join(self._dir or self.directory, f"layer_{depth}.bin")
+
+    def layer(self, depth: int) -> Iterator[State]:
+        """Yield the states at the given depth, as found by the last search."""
+        return map(self.decode, _read_records(self._layer_path(depth)))
+
+    def search(self) -> List[List[Action]]:
+        directory = self._open()
+        try:
+            self.layer_sizes = [_write_records(self._layer_path(0), [self.encode(self.problem.initial_state())])]
+            depth = 0
+            while self.layer_sizes[depth]:
+                runs = _SortedRuns(directory, self.memory)
+                for state in self.layer(depth):
+                    if self.problem.is_goal(state):
+                        return [self._reconstruct_path(state, depth)]
+                    for action in self.problem.actions(state):
+                        runs.add(self.encode(self.problem.result(state, action)))
+                first = 0 if self.locality is None else max(0, depth + 1 - self.locality)
+                # the layers are disjoint, so merging their sorted files gives one sorted stream
+                previous = heapq.merge(*(_read_records(self._layer_path(d)) for d in range(first, depth + 1)))
+                depth += 1
+                self.layer_sizes.append(_write_records(self._layer_path(depth), _subtract(_unique(runs.merged()), previous)))
+            self.layer_sizes.pop()
+            return []
+        finally:
+            self._close()
+
+    def _reconstruct_path(self, state: State, depth: int) -> List[Action]:
+        actions = []
+        target = self.encode(state)
+        for d in range(depth - 1, -1, -1):
+            for parent in self.layer(d):
+                step = self._action_to(parent, target)
+                if step is not None:
+                    actions.append(step[0])
+                    target = self.encode(parent)
+                    break
+        actions.append(Action.STAY)
+        actions.reverse()
+        return actions
+
+class ExternalAStar(_ExternalSearch):
+    """
+    ExternalAStar class represents external-memory A* on a bucketed priority queue: the states are appended to the
+    file of the bucket of their integer f = g + h, and the buckets are expanded in increasing order. A bucket is
+    read in rounds, each sorted in runs, merged keeping the least g of every state, stripped of the states
+    closed before by merging with the sorted file of all closed states, and closed itself, until no successor
+    falls into it again. The costs and the heuristic must be integers and the heuristic consistent; the closed records
+    keep the parent of every state, and the path is rebuilt by looking up each parent in its own bucket.
+
+    Args:
+        problem (HeuristicSearchProblem): The search problem.
+        directory (str|None, optional): The directory of the bucket files, temporary if None. Defaults to None.
+        memory (int, optional): The most records held in memory before a sorted run is written. Defaults to 1 << 20.
+        encode (Callable[[State], bytes], optional): The compact encoding of a state, equal for equal states.
+            Defaults to the pickled problem.encode, required if the problem is not compact.
+        decode (Callable[[bytes], State], optional): The inverse of encode. Defaults to the inverse of the default encode.
+
+    Attributes:
+        cost (float): The cost of the path found, inf if there is none.
+        expanded (int): The number of states expanded by the last search.
+    """
+    def __init__(self, problem: HeuristicSearchProblem, directory: str|None = None, memory: int = 1 << 20,
+                 encode: Callable[[State], bytes]|None = None, decode: Callable[[bytes], State]|None = None) -> None:
+        super().__init__(problem, directory, memory, encode, decode)
+        self.cost = math.inf
+        self.expanded = 0
+
+    def _h(self, state: State) -> int:
+        return int(self.problem.heuristic(state))
+
+    @staticmethod
+    def _record(state: bytes, g: float, parent: bytes) -> bytes:
+        return _LENGTH.pack(len(state)) + state + _COST.pack(g) + parent
+
+    @staticmethod
+    def _fields(record: bytes) -> Tuple[bytes, float, bytes]:
+        n = _LENGTH.unpack_from(record)[0]
+        start = _LENGTH.size + n
+        return record[_LENGTH.size:start], _COST.unpack_from(record, start)[0], record[start + _COST.size:]
+
+    def _bucket_path(self, f: int, kind: str, round: int = 0) -> str:
+        return os.path.join(self._dir, f"{kind}_{f}_{round}.bin")
+
+    def _state_of(self, record: bytes) -> bytes:
+        return record[_LENGTH.size:_LENGTH.size + _LENGTH.unpack_from(record)[0]]
+
+    def search(self) -> List[List[Action]]:
+        directory = self._open()
+        # the open records of a bucket are appended to its file as they are generated
+        buckets: Dict[int, BinaryIO] = {}
+        closed: Dict[int, List[str]] = {}
+        self.expanded = 0
+        self.cost = math.inf
+
+        def push(f: int, record: bytes) -> None:
+            if f not in buckets:
+                buckets[f] = open(self._bucket_path(f, "open"), "ab", buffering=1 << 16)
+            buckets[f].write(_LENGTH.pack(len(record)) + record)
+
+        try:
+            # the sorted encodings of all the closed states, merged with every closed round
+            closed_path = os.path.join(directory, "closed.bin")
+            _write_records(closed_path, [])
+            init = self.problem.initial_state()
+            push(self._h(init), self._record(self.encode(init), 0, b""))
+            while buckets:
+                f = min(buckets)
+                while f in buckets:
+                    buckets.pop(f).close()
+                    path = self._bucket_path(f, "open")
+                    runs = _SortedRuns(directory, self.memory, key=lambda record: (self._state_of(record), self._fields(record)[1]))
+                    for record in _read_records(path):
+                        runs.add(record)
+                    os.remove(path)
+                    # the least g of every state, minus the states closed before, in this bucket or a lower one
+                    files = closed.setdefault(f, [])
+                    fresh = _subtract(_unique(runs.merged(), self._state_of), _read_records(closed_path), self._state_of)
+                    round_path = self._bucket_path(f, "closed", len(files))
+                    _write_records(round_path, fresh)
+                    files.append(round_path)
+                    _write_records(closed_path + ".new", heapq.merge(_read_records(closed_path),
+                                                                     map(self._state_of, _read_records(round_path))))
+                    os.replace(closed_path + ".new", closed_path)
+                    for record in _read_records(round_path):
+                        encoded, g, parent = self._fields(record)
+                        state = self.decode(encoded)
+                        if self.problem.is_goal(state):
+                            self.cost = g
+                            return [self._reconstruct_path(encoded, parent, g, closed)]
+                        self.expanded += 1
+                        for action in self.problem.actions(state):
+                            next_state = self.problem.result(state, action)
+                            next_g = g + self.problem.action_cost(state, action)
+                            push(int(next_g) + self._h(next_state), self._record(self.encode(next_state), next_g, encoded))
+            return []
+        finally:
+            for file in buckets.values():
+                file.close()
+            self._close()
+
+    def _reconstruct_path(self, encoded: bytes, parent_code: bytes, g: float, closed: Dict[int, List[str]]) -> List[Action]:
+        actions = []
+        while parent_code:
+            parent = self.decode(parent_code)
+            action, cost = self._action_to(parent, encoded)
+            actions.append(action)
+            g -= cost
+            record = self._find(closed[int(g) + self._h(parent)], parent_code)
+            encoded, parent_code = parent_code, self._fields(record)[2]
+        actions.append(Action.STAY)
+        actions.reverse()
+        return actions
+
+    def _find(self, files: List[str], encoded: bytes) -> bytes:
+        """Return the closed record of the encoded state among the closed files of its bucket."""
+        for file in files:
+            for record in _read_records(file):
+                if self._state_of(record) == encoded:
+                    return record
+        raise KeyError(encoded)
+
+class ExternalDijkstra(ExternalAStar):
+    """ExternalDijkstra class is ExternalAStar with the heuristic 0, the buckets are the integer costs."""
+    def __init__(self, problem: SearchProblem, directory: str|None = None, memory: int = 1 << 20,
+                 encode: Callable[[State], bytes]|None = None, decode: Callable[[bytes], State]|None = None) -> None:
+        super().__init__(problem, directory, memory, encode, decode)
+
+    def _h(self, state: State) -> int:
+        return 0
@@ -0,0 +1,207 @@
+import time
+import math
+import random
+from typing import List, Iterable, Tuple
+
+from .search import Search
+from .problem import GameProblem, State, Action
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+class Zobrist:
+    """
+    Zobrist hashing: a random 64-bit number for every (feature, value) pair, XORed together.
+    Problems use it in GameProblem.key and update keys incrementally in GameProblem.child_key.
+
+    Args:
+        n_features (int): The number of features, e.g. the squares of a board.
+        n_values (int): The number of values a feature can take, e.g. the kinds of pieces.
+        seed (int|None, optional): The seed of the random numbers. Defaults to None.
+
+    Attributes:
+        table (list[list[int]]): The random number of every (feature, value) pair.
+        side (int): A random number to XOR in when the player to move is part of the position.
+    """
+    def __init__(self, n_features: int, n_values: int, seed: int|None = None) -> None:
+        rng = random.Random(seed)
+        self.table = [[rng.getrandbits(64) for _ in range(n_values)] for _ in range(n_features)]
+        self.side = rng.getrandbits(64)
+
+    def key(self, features: Iterable[Tuple[int, int]]) -> int:
+        """Return the key of the given (feature, value) pairs."""
+        key = 0
+        for feature, value in features:
+            key ^= self.table[feature][value]
+        return key
+
+    def toggle(self, key: int, feature: int, value: int) -> int:
+        """Add or remove a (feature, value) pair from the key."""
+        return key ^ self.table[feature][value]
+
+class TranspositionTable:
+    """
+    A fixed-size transposition table indexed by the low bits of the key.
+    An entry is replaced when it is from an older search or when the new entry is searched at least as deep.
+
+    Args:
+        size (int, optional): The number of slots, rounded up to a power of two. Defaults to 1 << 20.
+
+    Attributes:
+        entries (list): The slots, each None or a tuple (key, depth, flag, value, action, age).
+        age (int): The number of the current search.
+    """
+    def __init__(self, size: int = 1 << 20) -> None:
+        size = 1 << max(0, (size - 1).bit_length())
+        self.mask = size - 1
+        self.entries: list = [None] * size
+        self.age = 0
+
+    def probe(self, key: int) -> tuple|None:
+        entry = self.entries[key & self.mask]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key: int, depth: int, flag: int, value: int|float, action: Action|None) -> None:
+        index = key & self.mask
+        entry = self.entries[index]
+        if entry is None or entry[0] == key or entry[5] != self.age or depth >= entry[1]:
+            self.entries[index] = (key, depth, flag, value, action, self.age)
+
+    def new_search(self) -> None:
+        self.age += 1
+
+    def clear(self) -> None:
+        self.entries = [None] * len(self.entries)
+
+class _Timeout(Exception):
+    pass
+
+class AlphaBeta(Search):
+    """
+    AlphaBeta class represents an iterative deepening negamax search with principal variation search,
+    a transposition table and killer/history move ordering.
+    The table is keyed on problem.key, so images of a position under the symmetries of a symmetric game share entries.
+
+    Args:
+        problem (GameProblem): The game to search.
+        max_depth (int, optional): The deepest iteration. Defaults to 64.
+        time_limit (int|float|None, optional): The time limit in milliseconds. Defaults to None.
+        tt_size (int, optional): The number of slots of the transposition table. Defaults to 1 << 20.
+
+    Attributes:
+        tt (TranspositionTable): The transposition table, kept between searches.
+        value (int|float): The value of the last completed iteration for the player to move.
+        depth (int): The depth of the last completed iteration.
+        nodes (int): The number of nodes visited by the last search.
+
+    Methods:
+        search(): Return the principal variation of the deepest completed iteration.
+    """
+    def __init__(self, problem: GameProblem, max_depth: int = 64, time_limit: int|float|None = None, tt_size: int = 1 << 20) -> None:
+        super().__init__(problem)
+        if max_depth < 1:
+            raise ValueError("Max depth must be at least one")
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.tt = TranspositionTable(tt_size)
+        self.history: dict = {}
+        self.value: int|float = 0
+        self.depth = 0
+        self.nodes = 0
+
+    def search(self) -> List[List[Action]]:
+        state = self.problem.initial_state()
+        if self.problem.is_terminal(state):
+            return []
+        key = self.problem.key(state)
+        self.tt.new_search()
+        self.nodes = 0
+        self.killers: list = [[None, None] for _ in range(self.max_depth + 1)]
+        self._pv: list = [[] for _ in range(self.max_depth + 2)]
+        for action in self.history:
+            self.history[action] //= 2
+        self._deadline = None
+        start = time.time()
+        pv: List[Action] = []
+        for depth in range(1, self.max_depth + 1):
+            try:
+                value = self._negamax(state, key, depth, -math.inf, math.inf, 0)
+            except _Timeout:
+                break
+            self.value, self.depth, pv = value, depth, self._pv[0]
+            if self.time_limit is not None:
+                # the first iteration always completes, so there is a move to play
+                self._deadline = start + self.time_limit / 1000
+        return [pv] if pv else []
+
+    def _negamax(self, state: State, key: int, depth: int, alpha: int|float, beta: int|float, ply: int) -> int|float:
+        self.nodes += 1
+        if self._deadline is not None and self.nodes & 1023 == 0 and time.time() > self._deadline:
+            raise _Timeout
+        self._pv[ply] = []
+        if self.problem.is_terminal(state):
+            return self.problem.utility(state)
+        if depth == 0:
+            return self.problem.heuristic(state)
+
+        alpha_orig = alpha
+        tt_action = None
+        entry = self.tt.probe(key)
+        if entry is not None:
+            tt_action = entry[4]
+            if ply > 0 and entry[1] >= depth:
+                flag, value = entry[2], entry[3]
+                if flag == EXACT:
+                    return value
+                if flag == LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+
+        actions = self._order(self.problem.actions(state), tt_action, ply)
+        if not actions:
+            return self.problem.utility(state)
+        best_value, best_action = -math.inf, None
+        for i, action in enumerate(actions):
+            child = self.problem.result(state, action)
+            child_key = self.problem.child_key(state, key, action, child)
+            if i == 0:
+                value = -self._negamax(child, child_key, depth - 1, -beta, -alpha, ply + 1)
+            else:
+                # null window search, re-searched only if the move may be better
+                value = -self._negamax(child, child_key, depth - 1, -math.nextafter(alpha, math.inf), -alpha, ply + 1)
+                if alpha < value < beta:
+                    value = -self._negamax(child, child_key, depth - 1, -beta, -alpha, ply + 1)
+            if value > best_value:
+                best_value, best_action = value, action
+                if value > alpha:
+                    alpha = value
+                    self._pv[ply] = [action] + self._pv[ply + 1]
+                    if alpha >= beta:
+                        self._update_ordering(action, depth, ply)
+                        break
+
+        if best_value <= alpha_orig:
+            flag = UPPER
+        elif best_value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(key, depth, flag, best_value, best_action)
+        return best_value
+
+    def _order(self, actions: list[Action], tt_action: Action|None, ply: int) -> list[Action]:
+        """Order moves: the transposition table move, the killer moves, then by history score."""
+        killers = self.killers[ply]
+        history = self.history
+        return sorted(actions, key=lambda a: (a == tt_action, a == killers[0] or a == killers[1], history.get(a, 0)), reverse=True)
+
+    def _update_ordering(self, action: Action, depth: int, ply: int) -> None:
+        killers = self.killers[ply]
+        if action != killers[0]:
+            killers[1] = killers[0]
+            killers[0] = action
+        self.history[action] = self.history.get(action, 0) + depth * depth
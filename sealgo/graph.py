@@ -0,0 +1,271 @@
+import os
+import heapq
+import pickle
+from array import array
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+from .search import Search
+from .problem import SearchProblem, State, Action
+from .csr import gather, items
+
+class CompiledGraph:
+    """
+    A finite SearchProblem enumerated once into integer IDs, its edges stored as a CSR adjacency structure
+    in NumPy arrays, so that repeated queries on the same map do not call back into the problem.
+
+    Attributes:
+        states (List[State]): The state of every ID, 0 is the (first) initial state.
+        index (Dict[State, int]): The ID of every state.
+        actions (List[Action]): The action of every edge.
+        indptr (np.ndarray): The edges of state i are indptr[i]:indptr[i+1].
+        indices (np.ndarray): The target state of every edge.
+        weights (np.ndarray): The cost of every edge.
+        goals (np.ndarray): Whether every state is a goal state of the compiled problem.
+        heuristics (np.ndarray|None): The heuristic value of every state, if the problem has a heuristic.
+
+    Methods:
+        from_problem(problem: SearchProblem, max_states: int|None): Enumerate the states reachable from the initial state.
+        save(path: str): Save the graph into a directory.
+        load(path: str, mmap: bool): Load a saved graph, the arrays memory-mapped read-only by default.
+        id(state: State|int) -> int: Return the ID of a state, or an ID that is not a state as it is.
+        path(edges: Sequence[int]) -> List[Action]: Return the actions of a path of edges.
+    """
+    _ARRAYS = ("indptr", "indices", "weights", "goals", "heuristics")
+
+    def __init__(self, states: List[State], actions: List[Action], indptr: np.ndarray, indices: np.ndarray,
+                 weights: np.ndarray, goals: np.ndarray, heuristics: np.ndarray|None = None) -> None:
+        self.states = states
+        self.index: Dict[State, int] = {state: i for i, state in enumerate(states)}
+        self.actions = actions
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.goals = goals
+        self.heuristics = heuristics
+
+    @classmethod
+    def from_problem(cls, problem: SearchProblem, max_states: int|None = None) -> "CompiledGraph":
+        """Enumerate the states reachable from the initial state(s) breadth-first, calling the problem once per state and action."""
+        init = problem.initial_state()
+        states = list(init) if isinstance(init, list) else [init]
+        index = {state: i for i, state in enumerate(states)}
+        actions: List[Action] = []
+        indptr, indices, weights = array('q', [0]), array('i'), array('d')
+        goals = array('b')
+        heuristic = getattr(problem, "heuristic", None)
+        heuristics = array('d') if heuristic is not None else None
+        i = 0
+        while i < len(states):
+            state = states[i]
+            goals.append(problem.is_goal(state))
+            if heuristics is not None:
+                heuristics.append(heuristic(state))
+            for action in problem.actions(state):
+                next_state = problem.result(state, action)
+                j = index.get(next_state)
+                if j is None:
+                    if max_states is not None and len(states) >= max_states:
+                        raise MemoryError(f"More than {max_states} states are reachable")
+                    j = index[next_state] = len(states)
+                    states.append(next_state)
+                actions.append(action)
+                indices.append(j)
+                weights.append(problem.action_cost(state, action))
+            indptr.append(len(indices))
+            i += 1
+        return cls(states, actions, np.frombuffer(indptr, dtype=np.int64), np.frombuffer(indices, dtype=np.int32),
+                   np.frombuffer(weights, dtype=np.float64), np.frombuffer(goals, dtype=np.int8).astype(bool),
+                   None if heuristics is None else np.frombuffer(heuristics, dtype=np.float64))
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def id(self, state: State|int) -> int:
+        """
+        Return the ID of the given state. The states are looked up first, so an int is an ID only if it is not a state,
+        as for problems whose states are ints.
+        """
+        i = self.index.get(state)
+        if i is not None:
+            return i
+        if isinstance(state, (int, np.integer)) and 0 <= state < len(self.states):
+            return int(state)
+        raise KeyError(state)
+
+    def save(self, path: str) -> None:
+        """Save the arrays as .npy files and the states and actions as a pickle into the directory path."""
+        os.makedirs(path, exist_ok=True)
+        for name in self._ARRAYS:
+            values = getattr(self, name)
+            if values is not None:
+                np.save(os.path.join(path, f"{name}.npy"), values)
+        with open(os.path.join(path, "objects.pkl"), "wb") as f:
+            pickle.dump((self.states, self.actions), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "CompiledGraph":
+        """
+        Load a graph saved into the directory path. With mmap, the arrays are memory-mapped read-only,
+        so that worker processes loading the same graph share its pages.
+        """
+        arrays = {}
+        for name in cls._ARRAYS:
+            file = os.path.join(path, f"{name}.npy")
+            arrays[name] = np.load(file, mmap_mode="r" if mmap else None) if os.path.exists(file) else None
+        with open(os.path.join(path, "objects.pkl"), "rb") as f:
+            states, actions = pickle.load(f)
+        return cls(states, actions, **arrays)
+
+    def path(self, edges: Sequence[int]) -> List[Action]:
+        """Return the actions of the given edges, starting with Action.STAY as the other engines do."""
+        return [Action.STAY] + [self.actions[e] for e in edges]
+
+class GraphSearch(Search):
+    """
+    The base class of the searches on a CompiledGraph.
+
+    Args:
+        graph (CompiledGraph): The compiled graph.
+        source (State|int|None, optional): The state to search from, or its ID, see CompiledGraph.id. Defaults to the initial state.
+        goal (State|int|None, optional): The state to reach, or its ID. Defaults to the goal states of the compiled problem.
+
+    Attributes:
+        parents (dict|np.ndarray): The edge leading to every state reached, -1 at the source.
+        expanded (int): The number of states expanded by the last search.
+
+    Methods:
+        search() -> List[List[Action]]: Return the path found from the source to the goal.
+        path_to(goal: State|int) -> List[Action]|None: Return the path to a state reached by the last search.
+    """
+    def __init__(self, graph: CompiledGraph, source: State|int|None = None, goal: State|int|None = None) -> None:
+        self.graph = graph
+        self.problem = graph
+        self.source = 0 if source is None else graph.id(source)
+        self.goal = None if goal is None else graph.id(goal)
+        self.parents: dict = {}
+        self.expanded = 0
+
+    def path_to(self, goal: State|int) -> List[Action]|None:
+        u = self.graph.id(goal)
+        edge = self._parent(u)
+        if edge is None:
+            return None
+        edges = []
+        while edge >= 0:
+            edges.append(edge)
+            u = self._source_of(edge)
+            edge = self._parent(u)
+        edges.reverse()
+        return self.graph.path(edges)
+
+    def _parent(self, u: int) -> int|None:
+        return self.parents.get(u)
+
+    def _source_of(self, edge: int) -> int:
+        return int(np.searchsorted(self.graph.indptr.view(np.ndarray), edge, side="right")) - 1
+
+class GraphBFS(GraphSearch):
+    """
+    GraphBFS class represents a breadth-first search for the path of fewest edges, expanding whole layers
+    of states at once with NumPy operations.
+    """
+    def search(self) -> List[List[Action]]:
+        graph = self.graph
+        # -2 marks the states not reached yet
+        parents = np.full(len(graph), -2, dtype=np.int64)
+        parents[self.source] = -1
+        frontier = np.array([self.source], dtype=np.int64)
+        self.expanded = 0
+        is_goal = graph.goals[self.source] if self.goal is None else self.source == self.goal
+        found = self.source if is_goal else None
+        while found is None and len(frontier):
+            self.expanded += len(frontier)
+            _, edges = gather(graph.indptr, frontier)
+            targets = graph.indices[edges]
+            fresh = parents[targets] == -2
+            targets, edges = targets[fresh], edges[fresh]
+            targets, first = np.unique(targets, return_index=True)
+            edges = edges[first]
+            parents[targets] = edges
+            frontier = targets
+            reached = frontier[graph.goals[frontier]] if self.goal is None else frontier[frontier == self.goal]
+            if len(reached):
+                found = int(reached[0])
+        self.parents = parents
+        return [] if found is None else [self.path_to(found)]
+
+    def _parent(self, u: int) -> int|None:
+        edge = int(self.parents[u])
+        return None if edge == -2 else edge
+
+class GraphDijkstra(GraphSearch):
+    """
+    GraphDijkstra class represents Dijkstra's algorithm on the CSR arrays, with a binary heap of state IDs.
+    The arrays are read one item at a time through plain ndarray views, so a memory-mapped graph is never
+    copied into the process.
+
+    Attributes:
+        g_costs (dict): The cost of the best path found to every state reached.
+    """
+    def __init__(self, graph: CompiledGraph, source: State|int|None = None, goal: State|int|None = None) -> None:
+        super().__init__(graph, source, goal)
+        self.g_costs: dict = {}
+
+    def _h(self, u: int) -> float:
+        return 0
+
+    def search(self) -> List[List[Action]]:
+        graph = self.graph
+        indptr, indices, weights, goals = (items(array) for array in
+                                           (graph.indptr, graph.indices, graph.weights, graph.goals))
+        goal = self.goal
+        h = self._h
+        g_costs = {self.source: 0}
+        parents = {self.source: -1}
+        closed = set()
+        frontier = [(h(self.source), self.source)]
+        self.expanded = 0
+        found = None
+        while frontier:
+            _, u = heapq.heappop(frontier)
+            if u in closed:
+                continue
+            if u == goal if goal is not None else goals(u):
+                found = u
+                break
+            closed.add(u)
+            self.expanded += 1
+            g = g_costs[u]
+            for e in range(indptr(u), indptr(u + 1)):
+                v = indices(e)
+                g_v = g + weights(e)
+                if g_v < g_costs.get(v, float("inf")):
+                    g_costs[v] = g_v
+                    parents[v] = e
+                    heapq.heappush(frontier, (g_v + h(v), v))
+        self.g_costs, self.parents = g_costs, parents
+        return [] if found is None else [self.path_to(found)]
+
+class GraphAStar(GraphDijkstra):
+    """
+    GraphAStar class represents the A* algorithm on the CSR arrays.
+
+    Args:
+        heuristic (np.ndarray|Callable[[int], float]|None, optional): The heuristic of every state ID toward the goal.
+            Defaults to the heuristics compiled from the problem, which estimate the cost to its own goal.
+        weight (float|int, optional): The weight of the heuristic. Defaults to 1.
+    """
+    def __init__(self, graph: CompiledGraph, source: State|int|None = None, goal: State|int|None = None,
+                 heuristic: np.ndarray|Callable[[int], float]|None = None, weight: float|int = 1) -> None:
+        super().__init__(graph, source, goal)
+        if heuristic is None:
+            if graph.heuristics is None:
+                raise ValueError("The compiled problem has no heuristic")
+            heuristic = graph.heuristics
+        if isinstance(heuristic, np.ndarray):
+            values = items(heuristic)
+            self._h = lambda u: weight * values(u)
+        else:
+            self._h = lambda u: weight * heuristic(u)
@@ -0,0 +1,258 @@
+import math
+import heapq
+from abc import abstractmethod
+from itertools import count
+from typing import Callable, Dict, Hashable, Iterable, List, Tuple
+
+from .search import Search
+from .problem import HeuristicSearchProblem, BiSearchProblem, State, Action
+
+# the virtual state every goal state leads to at no cost, so LPA* has a single target
+_GOAL = "<goal>"
+# the keys are sums of float costs, which reach the same value in different orders up to rounding errors,
+# so keys closer than this are compared as equal
+_TOLERANCE = 1e-9
+
+def _key_less(a: Tuple[float, float], b: Tuple[float, float]) -> bool:
+    """Return whether key a is less than key b, their parts compared with _TOLERANCE."""
+    if a[0] < b[0] - _TOLERANCE:
+        return True
+    if a[0] > b[0] + _TOLERANCE:
+        return False
+    return a[1] < b[1] - _TOLERANCE
+
+class _IncrementalSearch(Search):
+    """
+    The core shared by LPA* and D* Lite: g and rhs values of the states, a priority queue of the inconsistent states,
+    and the edges of the search direction read from the problem when a state is expanded, so the predecessors
+    of a state in that direction are known without a reverse model.
+    """
+    def __init__(self, problem, sources: Iterable[Hashable], target: Hashable) -> None:
+        self.problem = problem
+        self.sources = set(sources)
+        self.target = target
+        self.km = 0.0
+        self.g: Dict[Hashable, float] = {}
+        self.rhs: Dict[Hashable, float] = {source: 0.0 for source in self.sources}
+        self.out_edges: Dict[Hashable, Dict[Hashable, Tuple[float, Action|None]]] = {}
+        self.in_edges: Dict[Hashable, Dict[Hashable, Tuple[float, Action|None]]] = {}
+        self._queue: list = []
+        self._queued: Dict[Hashable, tuple] = {}
+        self._counter = count()
+        self._expand_ties = False
+        self.expanded = 0
+        for source in self.sources:
+            self._push(source)
+
+    @abstractmethod
+    def _read_edges(self, u: Hashable) -> Dict[Hashable, Tuple[float, Action|None]]:
+        """Return the edges out of u in the search direction as {v: (cost, action)}."""
+        pass
+
+    @abstractmethod
+    def _h(self, u: Hashable) -> float:
+        """Return the heuristic of u toward the target."""
+        pass
+
+    def _key(self, u: Hashable) -> Tuple[float, float]:
+        best = min(self.g.get(u, math.inf), self.rhs.get(u, math.inf))
+        return (best + self._h(u) + self.km, best)
+
+    def _push(self, u: Hashable) -> None:
+        key = self._key(u)
+        self._queued[u] = key
+        heapq.heappush(self._queue, (key, next(self._counter), u))
+
+    def _top(self) -> Tuple[Tuple[float, float], Hashable|None]:
+        """Return the least key of the queue, dropping the outdated entries on top."""
+        queue, queued = self._queue, self._queued
+        while queue and queued.get(queue[0][2]) != queue[0][0]:
+            heapq.heappop(queue)
+        if not queue:
+            return (math.inf, math.inf), None
+        return queue[0][0], queue[0][2]
+
+    def _update_vertex(self, v: Hashable) -> None:
+        if v not in self.sources:
+            in_edges = self.in_edges.get(v, {})
+            self.rhs[v] = min((self.g.get(u, math.inf) + cost for u, (cost, _) in in_edges.items()), default=math.inf)
+        self._queued.pop(v, None)
+        if self.g.get(v, math.inf) != self.rhs.get(v, math.inf):
+            self._push(v)
+
+    def _out(self, u: Hashable) -> Dict[Hashable, Tuple[float, Action|None]]:
+        edges = self.out_edges.get(u)
+        if edges is None:
+            edges = self.out_edges[u] = self._read_edges(u)
+            for v, edge in edges.items():
+                self.in_edges.setdefault(v, {})[u] = edge
+        return edges
+
+    def _compute_shortest_path(self) -> None:
+        target = self.target
+        self.expanded = 0
+        while True:
+            key, u = self._top()
+            target_key = self._key(target)
+            done = _key_less(target_key, key) or (not _key_less(key, target_key) and not self._expand_ties)
+            if u is None or (done and self.rhs.get(target, math.inf) == self.g.get(target, math.inf)):
+                break
+            new_key = self._key(u)
+            if _key_less(key, new_key):
+                # the key grew since it was queued, as the heuristic moves with the start in D* Lite
+                self._push(u)
+                continue
+            heapq.heappop(self._queue)
+            del self._queued[u]
+            self.expanded += 1
+            if self.g.get(u, math.inf) > self.rhs.get(u, math.inf):
+                self.g[u] = self.rhs[u]
+                for v in self._out(u):
+                    self._update_vertex(v)
+            else:
+                self.g[u] = math.inf
+                for v in list(self._out(u)) + [u]:
+                    self._update_vertex(v)
+
+    def update(self, states: Iterable[State]) -> None:
+        """
+        Notify that the edges around the given states changed (costs, blocked or freed states): the edges of these states
+        and of their known neighbours are read again, and only the states whose values they affect are queued.
+        When a state becomes passable again, pass its neighbours, as no edge into it is known yet.
+        """
+        touched = set()
+        for state in states:
+            touched.add(state)
+            touched.update(self.in_edges.get(state, ()))
+            touched.update(self.out_edges.get(state, ()))
+        for u in touched:
+            if u not in self.out_edges:
+                continue
+            old = self.out_edges.pop(u)
+            for v in old:
+                self.in_edges[v].pop(u, None)
+            new = self._out(u)
+            for v in set(old) | set(new):
+                self._update_vertex(v)
+
+class LPAStar(_IncrementalSearch):
+    """
+    LPAStar class represents Lifelong Planning A*: an A* that keeps its g values between searches and, after
+    edge costs change (see update), repairs only the states whose distance from the initial state changed.
+    The edges are read from the problem when a state is expanded, and the predecessors of a state are the
+    expanded states that lead to it.
+
+    Args:
+        problem (HeuristicSearchProblem): The search problem, its heuristic must be consistent.
+
+    Attributes:
+        g (Dict[State, float]): The distance of the states from the initial state, as of the last search.
+        expanded (int): The number of states expanded by the last search.
+
+    Methods:
+        search(): Return the shortest path from the initial state to a goal, repairing the previous search.
+        update(states: Iterable[State]): Notify that the edges around the given states changed.
+    """
+    def __init__(self, problem: HeuristicSearchProblem) -> None:
+        super().__init__(problem, [problem.initial_state()], _GOAL)
+        # the edges into the virtual goal cost 0, so a goal state queued with the same key may still lower it
+        self._expand_ties = True
+
+    def _h(self, u: Hashable) -> float:
+        return 0 if u is _GOAL else self.problem.heuristic(u)
+
+    def _read_edges(self, u: Hashable) -> Dict[Hashable, Tuple[float, Action|None]]:
+        if u is _GOAL:
+            return {}
+        edges: Dict[Hashable, Tuple[float, Action|None]] = {}
+        for action in self.problem.actions(u):
+            v = self.problem.result(u, action)
+            cost = self.problem.action_cost(u, action)
+            if v not in edges or cost < edges[v][0]:
+                edges[v] = (cost, action)
+        if self.problem.is_goal(u):
+            edges[_GOAL] = (0, None)
+        return edges
+
+    def search(self) -> List[List[Action]]:
+        self._compute_shortest_path()
+        if math.isinf(self.g.get(_GOAL, math.inf)):
+            return []
+        actions = []
+        # walk back from the goal along the predecessors that realize the g values
+        v = min(self.in_edges[_GOAL], key=lambda u: self.g.get(u, math.inf))
+        visited = {v}
+        while v not in self.sources:
+            u, (_, action) = min(self.in_edges[v].items(), key=lambda item: self.g.get(item[0], math.inf) + item[1][0])
+            if u in visited:
+                raise RuntimeError(f"The predecessors of LPAStar form a cycle at {u}")
+            visited.add(u)
+            actions.append(action)
+            v = u
+        actions.append(Action.STAY)
+        actions.reverse()
+        return [actions]
+
+class DStarLite(_IncrementalSearch):
+    """
+    DStarLite class represents D* Lite: LPA* run backwards from the goal states to the agent, so the agent can move
+    (see move_to) without invalidating the g values, which are distances to the goals.
+    The heuristic moves with the agent, and the keys are corrected by km instead of reordering the queue.
+
+    Args:
+        problem (BiSearchProblem): The search problem, read backwards through actions_to and reason from goal_states().
+        heuristic (Callable[[State, State], float]|None, optional): A consistent estimate of the cost from the first
+            state to the second. Defaults to None, which is 0.
+
+    Attributes:
+        start (State): The state of the agent.
+        g (Dict[State, float]): The distance of the states to the goals, as of the last search.
+        expanded (int): The number of states expanded by the last search.
+
+    Methods:
+        search(): Return the shortest path from the agent to a goal, repairing the previous search.
+        move_to(state: State): Move the agent to the given state.
+        update(states: Iterable[State]): Notify that the edges around the given states changed.
+    """
+    def __init__(self, problem: BiSearchProblem, heuristic: Callable[[State, State], float]|None = None) -> None:
+        self.heuristic = heuristic
+        self.start = problem.initial_state()
+        super().__init__(problem, problem.goal_states(), self.start)
+
+    def _h(self, u: Hashable) -> float:
+        return 0 if self.heuristic is None else self.heuristic(self.start, u)
+
+    def _read_edges(self, u: Hashable) -> Dict[Hashable, Tuple[float, Action|None]]:
+        edges: Dict[Hashable, Tuple[float, Action|None]] = {}
+        for action in self.problem.actions_to(u):
+            v = self.problem.reason(u, action)
+            # the cost of a backward edge is read as in BiDirectional
+            cost = self.problem.action_cost(u, action)
+            if v not in edges or cost < edges[v][0]:
+                edges[v] = (cost, action)
+        return edges
+
+    def move_to(self, state: State) -> None:
+        """Move the agent to the given state, usually the next state of the last path."""
+        self.km += self._h(state)
+        self.start = state
+        self.target = state
+
+    def search(self) -> List[List[Action]]:
+        self._compute_shortest_path()
+        if math.isinf(self.g.get(self.start, math.inf)):
+            return []
+        actions = [Action.STAY]
+        u = self.start
+        visited = {u}
+        # the successors of u are the states whose backward edges lead to u
+        while u not in self.sources:
+            u, (_, action) = min(self._successors(u).items(), key=lambda item: self.g.get(item[0], math.inf) + item[1][0])
+            if u in visited:
+                raise RuntimeError(f"The successors of DStarLite form a cycle at {u}")
+            visited.add(u)
+            actions.append(action)
+        return [actions]
+
+    def _successors(self, u: State) -> Dict[Hashable, Tuple[float, Action|None]]:
+        return self.in_edges.get(u, {})
@@ -0,0 +1,256 @@
+import math
+import heapq
+from typing import Dict, List, Tuple
+
+from .search import Search
+from .problem import GridSearchProblem, Action
+
+class JPS(Search):
+    """
+    JPS class represents Jump Point Search, an A* on uniform-cost grids that skips the cells between jump points:
+    a move goes on in its direction until a cell with a forced neighbour (a neighbour only an optimal path through
+    that cell reaches) or a goal, so the many symmetric equal-cost paths of open areas are never pushed.
+    The cells of the grid are padded with a border of walls and numbered row by row.
+
+    Args:
+        problem (GridSearchProblem): The grid problem, 4-connected or 8-connected without cutting corners.
+
+    Attributes:
+        expanded (int): The number of jump points expanded by the last search.
+
+    Methods:
+        search(): Return the path of actions from the initial state to the nearest goal.
+    """
+    def __init__(self, problem: GridSearchProblem) -> None:
+        self.problem = problem
+        self.diagonal = problem.diagonal
+        self.rows, self.cols = problem.grid_shape()
+        self.width = self.cols + 2
+        self.open = [False] * ((self.rows + 2) * self.width)
+        for r in range(self.rows):
+            for c in range(self.cols):
+                if problem.passable((r, c)):
+                    self.open[(r + 1) * self.width + c + 1] = True
+        self.goals = {self._index(cell) for cell in problem.goal_cells()}
+        self.goal_cells = [divmod(goal, self.width) for goal in self.goals]
+        self.expanded = 0
+
+    def _index(self, cell: Tuple[int, int]) -> int:
+        return (cell[0] + 1) * self.width + cell[1] + 1
+
+    def _cell(self, index: int) -> Tuple[int, int]:
+        r, c = divmod(index, self.width)
+        return r - 1, c - 1
+
+    def search(self) -> List[List[Action]]:
+        start = self._index(self.problem.cell(self.problem.initial_state()))
+        g_costs = {start: 0}
+        parents: Dict[int, int|None] = {start: None}
+        frontier = [(self._heuristic(start), 0, start)]
+        closed = set()
+        self.expanded = 0
+        while frontier:
+            _, g, x = heapq.heappop(frontier)
+            if x in closed:
+                continue
+            if x in self.goals:
+                return [self._reconstruct_path(x, parents)]
+            closed.add(x)
+            self.expanded += 1
+            for direction in self._directions(x, parents[x]):
+                y = self._jump(x, direction)
+                if y is None:
+                    continue
+                g_y = g + self._distance(x, y)
+                if g_y < g_costs.get(y, math.inf):
+                    g_costs[y] = g_y
+                    parents[y] = x
+                    heapq.heappush(frontier, (g_y + self._heuristic(y), g_y, y))
+        return []
+
+    def _distance(self, x: int, y: int) -> float:
+        dr, dc = (abs(a - b) for a, b in zip(divmod(x, self.width), divmod(y, self.width)))
+        if self.diagonal:
+            return math.sqrt(2) * min(dr, dc) + abs(dr - dc)
+        return dr + dc
+
+    def _heuristic(self, x: int) -> float:
+        r, c = divmod(x, self.width)
+        if self.diagonal:
+            return min(math.sqrt(2) * min(abs(r - gr), abs(c - gc)) + abs(abs(r - gr) - abs(c - gc)) for gr, gc in self.goal_cells)
+        return min(abs(r - gr) + abs(c - gc) for gr, gc in self.goal_cells)
+
+    def _directions(self, x: int, parent: int|None) -> List[Tuple[int, int]]:
+        """Return the directions (dr, dc) to jump in from x, pruned by the direction it was reached in."""
+        open, w = self.open, self.width
+        if parent is None:
+            straight = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+            return straight + [(-1, -1), (-1, 1), (1, -1), (1, 1)] if self.diagonal else straight
+        (xr, xc), (pr, pc) = divmod(x, w), divmod(parent, w)
+        dr, dc = (xr > pr) - (xr < pr), (xc > pc) - (xc < pc)
+        directions = []
+        if dr and dc:
+            vertical, horizontal = open[x + dr * w], open[x + dc]
+            if vertical:
+                directions.append((dr, 0))
+            if horizontal:
+                directions.append((0, dc))
+            if vertical and horizontal:
+                directions.append((dr, dc))
+        elif dc:
+            up, down = open[x - w], open[x + w]
+            if open[x + dc]:
+                directions.append((0, dc))
+                if self.diagonal:
+                    directions += [(-1, dc)] * up + [(1, dc)] * down
+            directions += [(-1, 0)] * up + [(1, 0)] * down
+        else:
+            left, right = open[x - 1], open[x + 1]
+            if open[x + dr * w]:
+                directions.append((dr, 0))
+                if self.diagonal:
+                    directions += [(dr, -1)] * left + [(dr, 1)] * right
+            directions += [(0, -1)] * left + [(0, 1)] * right
+        return directions
+
+    def _forced(self, y: int, offset: int) -> bool:
+        """Check if a straight move by offset into y has a forced neighbour there."""
+        open = self.open
+        side = self.width if offset in (1, -1) else 1
+        return (open[y - side] and not open[y - side - offset]) or (open[y + side] and not open[y + side - offset])
+
+    def _straight(self, x: int, offset: int) -> int|None:
+        """Move straight from x until a goal or a forced neighbour, return None at a wall."""
+        open, goals = self.open, self.goals
+        while open[x + offset]:
+            x += offset
+            if x in goals or self._forced(x, offset):
+                return x
+        return None
+
+    def _jump(self, x: int, direction: Tuple[int, int]) -> int|None:
+        """Return the next jump point from x in the direction, or None."""
+        open, goals, w = self.open, self.goals, self.width
+        dr, dc = direction
+        offset = dr * w + dc
+        if dr and dc:
+            # a diagonal move stops where one of its straight components finds a jump point
+            while open[x + offset] and open[x + dr * w] and open[x + dc]:
+                x += offset
+                if x in goals or self._straight(x, dr * w) is not None or self._straight(x, dc) is not None:
+                    return x
+            return None
+        if self.diagonal or dc:
+            return self._straight(x, offset)
+        # on a 4-connected grid a vertical move stops where a horizontal scan finds a jump point
+        while open[x + offset]:
+            x += offset
+            if x in goals or self._forced(x, offset) or self._straight(x, 1) is not None or self._straight(x, -1) is not None:
+                return x
+        return None
+
+    def _reconstruct_path(self, goal: int, parents: Dict[int, int|None]) -> List[Action]:
+        """Fill in the cells between the jump points and look up the action of every step in the problem."""
+        jump_points = []
+        x: int|None = goal
+        while x is not None:
+            jump_points.append(x)
+            x = parents[x]
+        jump_points.reverse()
+        cells = [jump_points[0]]
+        for x, y in zip(jump_points, jump_points[1:]):
+            (xr, xc), (yr, yc) = divmod(x, self.width), divmod(y, self.width)
+            offset = ((yr > xr) - (yr < xr)) * self.width + (yc > xc) - (yc < xc)
+            while x != y:
+                x += offset
+                cells.append(x)
+        state = self.problem.initial_state()
+        actions = [Action.STAY]
+        for x in cells[1:]:
+            cell = self._cell(x)
+            for action in self.problem.actions(state):
+                next_state = self.problem.result(state, action)
+                if self.problem.cell(next_state) == cell:
+                    break
+            else:
+                raise ValueError(f"No action moves from {self.problem.cell(state)} to {cell}")
+            actions.append(action)
+            state = next_state
+        return actions
+
+class JPSPlus(JPS):
+    """
+    JPSPlus class represents JPS+: the distance of every cell to the next jump point in every direction is
+    precomputed regardless of the goal (positive, or minus the distance to a wall), so a jump is one table lookup.
+    The goal is caught by bounding: a jump stops early on the goal, or for the moves that scan sideways
+    (diagonal moves, or vertical moves on 4-connected grids) on the row or column of the goal.
+
+    Args:
+        problem (GridSearchProblem): The grid problem.
+        tables (Dict[int, list]|None, optional): The tables of a previous JPSPlus on the same grid. Defaults to None.
+
+    Attributes:
+        tables (Dict[int, list]): The jump distances of every cell, by the offset of the direction.
+    """
+    def __init__(self, problem: GridSearchProblem, tables: Dict[int, list]|None = None) -> None:
+        super().__init__(problem)
+        self.tables = self._build_tables() if tables is None else tables
+
+    def _build_tables(self) -> Dict[int, list]:
+        open, w = self.open, self.width
+        straight = [1, -1, w, -w] if self.diagonal else [1, -1]
+        tables: Dict[int, list] = {}
+        for offset in straight:
+            tables[offset] = self._sweep(offset, lambda x, y: open[y], lambda y: self._forced(y, offset))
+        if self.diagonal:
+            for dr in (-1, 1):
+                for dc in (-1, 1):
+                    offset = dr * w + dc
+                    tables[offset] = self._sweep(offset, lambda x, y: open[y] and open[x + dr * w] and open[x + dc],
+                                                 lambda y: tables[dr * w][y] > 0 or tables[dc][y] > 0)
+        else:
+            for offset in (w, -w):
+                tables[offset] = self._sweep(offset, lambda x, y: open[y],
+                                             lambda y: self._forced(y, offset) or tables[1][y] > 0 or tables[-1][y] > 0)
+        return tables
+
+    def _sweep(self, offset: int, can_move, is_jump_point) -> list:
+        """Compute the table of a direction, visiting the cells so that the next cell in the direction comes first."""
+        open = self.open
+        table = [0] * len(open)
+        for x in (range(len(open) - 1, -1, -1) if offset > 0 else range(len(open))):
+            if not open[x]:
+                continue
+            y = x + offset
+            if not can_move(x, y):
+                table[x] = 0
+            elif is_jump_point(y):
+                table[x] = 1
+            else:
+                k = table[y]
+                table[x] = k + 1 if k > 0 else k - 1
+        return table
+
+    def _jump(self, x: int, direction: Tuple[int, int]) -> int|None:
+        dr, dc = direction
+        offset = dr * self.width + dc
+        k = self.tables[offset][x]
+        reach = abs(k)
+        xr, xc = divmod(x, self.width)
+        sideways = (dr and dc) or (dr and not self.diagonal)
+        target = None
+        for gr, gc in self.goal_cells:
+            row, col = gr - xr, gc - xc
+            if sideways:
+                if row * dr <= 0 or (dc and col * dc <= 0):
+                    continue
+                steps = min(abs(row), abs(col)) if dc else abs(row)
+            elif (dr and (col != 0 or row * dr <= 0)) or (dc and (row != 0 or col * dc <= 0)):
+                continue
+            else:
+                steps = abs(row) + abs(col)
+            if steps <= reach and (target is None or steps < target):
+                target = steps
+        if target is not None:
+            return x + target * offset
+        return x + k * offset if k > 0 else None
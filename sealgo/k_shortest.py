@@ -0,0 +1,149 @@
+import math
+import heapq
+from itertools import count
+from typing import Callable, Dict, Iterator, List, Set, Tuple
+
+from .search import Search
+from .problem import SearchProblem, BiSearchProblem, State, Action
+from .landmarks import shortest_distances
+
+class _Path:
+    """A path of the k shortest: its states, actions, the cost up to every state, and the index it deviates at."""
+    __slots__ = ("states", "actions", "costs", "deviation")
+
+    def __init__(self, states: List[State], actions: List[Action], costs: List[float], deviation: int) -> None:
+        self.states = states
+        self.actions = actions
+        self.costs = costs
+        self.deviation = deviation
+
+class KShortestPaths(Search):
+    """
+    KShortestPaths class represents Yen's algorithm for the k shortest loopless paths. Every new path is the best
+    of the candidates: for each state of the last path from its deviation on (Lawler's rule), the shortest spur path
+    from that state that avoids the states before it and the next actions of the paths found with the same prefix.
+    For a BiSearchProblem, the distances to the goals are computed once by a backward Dijkstra, a shortest-path
+    tree that every spur A* uses as an exact heuristic; otherwise problem.heuristic is used if any.
+
+    Args:
+        problem (SearchProblem): The search problem, costs must be nonnegative.
+        k (int, optional): The number of paths returned by search. Defaults to 5.
+        reverse (bool, optional): Whether to build the backward shortest-path tree of a BiSearchProblem. Defaults to True.
+
+    Attributes:
+        costs (List[float]): The costs of the paths found so far, in order.
+
+    Methods:
+        search(): Return the k shortest paths, in order of cost, fewer if there are no more.
+        paths() -> Iterator[Tuple[float, List[Action]]]: Lazily yield the paths and their costs in order of cost.
+    """
+    def __init__(self, problem: SearchProblem, k: int = 5, reverse: bool = True) -> None:
+        self.problem = problem
+        self.k = k
+        self.reverse = reverse and isinstance(problem, BiSearchProblem)
+        self.costs: List[float] = []
+        self._to_goal: Dict[State, float]|None = None
+
+    def search(self) -> List[List[Action]]:
+        paths = []
+        for _, path in self.paths():
+            paths.append(path)
+            if len(paths) >= self.k:
+                break
+        return paths
+
+    def paths(self) -> Iterator[Tuple[float, List[Action]]]:
+        self.costs = []
+        heuristic = self._heuristic()
+        init = self.problem.initial_state()
+        first = self._spur(init, 0, set(), set(), heuristic)
+        if first is None:
+            return
+        found: List[_Path] = []
+        seen = {tuple(first.actions)}
+        candidates = [(first.costs[-1], 0, first)]
+        counter = count(1)
+        while candidates:
+            cost, _, path = heapq.heappop(candidates)
+            found.append(path)
+            self.costs.append(cost)
+            yield cost, [Action.STAY] + path.actions
+            for i in range(path.deviation, len(path.actions)):
+                spur_state = path.states[i]
+                # the next actions of the paths with the same prefix, and the states of the prefix, are avoided
+                banned_actions = {p.actions[i] for p in found
+                                  if len(p.actions) > i and p.actions[:i] == path.actions[:i]}
+                spur = self._spur(spur_state, path.costs[i], set(path.states[:i]), banned_actions, heuristic)
+                if spur is None:
+                    continue
+                candidate = _Path(path.states[:i] + spur.states, path.actions[:i] + spur.actions,
+                                  path.costs[:i] + spur.costs, i)
+                key = tuple(candidate.actions)
+                if key not in seen:
+                    seen.add(key)
+                    heapq.heappush(candidates, (candidate.costs[-1], next(counter), candidate))
+
+    def _heuristic(self) -> Callable[[State], float]:
+        if self.reverse:
+            # the distances are keyed on encode(state) for compact problems, shortest_distances returns states
+            key = self.problem.encode if getattr(self.problem, "compact", False) else None
+            if self._to_goal is None:
+                self._to_goal = {}
+                for goal in self.problem.goal_states():
+                    for state, distance in shortest_distances(self.problem, goal, reverse=True)[0].items():
+                        if key is not None:
+                            state = key(state)
+                        if distance < self._to_goal.get(state, math.inf):
+                            self._to_goal[state] = distance
+            to_goal = self._to_goal
+            if key is not None:
+                return lambda state: to_goal.get(key(state), math.inf)
+            return lambda state: to_goal.get(state, math.inf)
+        if hasattr(self.problem, "heuristic"):
+            return self.problem.heuristic
+        return lambda state: 0
+
+    def _spur(self, source: State, g0: float, banned_states: Set[State], banned_actions: Set[Action],
+              heuristic: Callable[[State], float]) -> _Path|None:
+        """Return the shortest path from source to a goal avoiding the banned states, and the banned actions at source."""
+        h = heuristic(source)
+        if math.isinf(h):
+            return None
+        g_costs = {source: g0}
+        parents: Dict[State, tuple] = {source: (None, None)}
+        closed = set()
+        counter = count()
+        frontier = [(g0 + h, next(counter), g0, source)]
+        while frontier:
+            _, _, g, state = heapq.heappop(frontier)
+            if state in closed:
+                continue
+            if self.problem.is_goal(state):
+                return self._path(state, parents, g_costs)
+            closed.add(state)
+            for action in self.problem.actions(state):
+                if state == source and action in banned_actions:
+                    continue
+                next_state = self.problem.result(state, action)
+                if next_state in banned_states or next_state in closed:
+                    continue
+                next_g = g + self.problem.action_cost(state, action)
+                if next_g < g_costs.get(next_state, math.inf):
+                    h = heuristic(next_state)
+                    if math.isinf(h):
+                        continue
+                    g_costs[next_state] = next_g
+                    parents[next_state] = (state, action)
+                    heapq.heappush(frontier, (next_g + h, next(counter), next_g, next_state))
+        return None
+
+    def _path(self, state: State, parents: Dict[State, tuple], g_costs: Dict[State, float]) -> _Path:
+        states, actions = [state], []
+        parent, action = parents[state]
+        while parent is not None:
+            states.append(parent)
+            actions.append(action)
+            parent, action = parents[parent]
+        states.reverse()
+        actions.reverse()
+        return _Path(states, actions, [g_costs[s] for s in states], 0)
@@ -0,0 +1,229 @@
+import random
+from copy import copy
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from .problem import SearchProblem, HeuristicSearchProblem, BiSearchProblem, State, Action
+from .best_first_search import Dijkstra
+
+def shortest_distances(problem: SearchProblem, source: State, reverse: bool = False) -> Tuple[Dict[State, float], Dict[State, tuple]]:
+    """
+    Run Dijkstra from the source until the frontier is empty and return the distance and predecessor of every state reached.
+    With reverse, the edges are followed backwards through BiSearchProblem.actions_to and reason, so the distances are to the source.
+    """
+    one_to_all = copy(problem)
+    one_to_all.initial_state = lambda: source
+    one_to_all.is_goal = lambda state: False
+    # the tables are keyed on the states themselves, not on canonical forms nor compact keys
+    one_to_all.symmetric = False
+    one_to_all.compact = False
+    if reverse:
+        one_to_all.actions = problem.actions_to
+        one_to_all.result = problem.reason
+    dijkstra = Dijkstra(one_to_all)
+    dijkstra.search()
+    return dijkstra.g_costs, dijkstra.predecessors
+
+class Landmarks:
+    """
+    Landmarks class precomputes the tables of ALT (A*, Landmarks, Triangle inequality): the distances from and to a few
+    landmark states, which give a lower bound of the distance between any two states by the triangle inequality.
+    The states are those reachable from the initial state. The reverse distances are computed through
+    BiSearchProblem.actions_to and reason, other problems must have symmetric costs (an undirected graph).
+
+    Args:
+        problem (SearchProblem): The finite search problem.
+        n_landmarks (int, optional): The number of landmarks. Defaults to 8.
+        selection (str, optional): "farthest" picks every landmark farthest from the ones picked before,
+            "avoid" picks landmarks in the regions of a shortest-path tree the current ones bound worst. Defaults to "avoid".
+        seed (int|None, optional): The seed of the random roots of the avoid selection. Defaults to None.
+
+    Attributes:
+        states (List[State]): The states reachable from the initial state.
+        index (Dict[State, int]): The row of every state in the tables.
+        landmarks (List[State]): The landmarks.
+        forward (np.ndarray): forward[i, l] is the distance from landmark l to state i, as float32 rounded down.
+        backward (np.ndarray): backward[i, l] is the distance from state i to landmark l, as float32 rounded down.
+        errors (np.ndarray): errors[i] is the most a distance of row i was rounded down by, 0 for integers below 2**24,
+            taken off the bounds so that they stay admissible.
+
+    Methods:
+        bound(state: State, goal: State) -> float: Return the lower bound of the distance from state to goal.
+        problem_to(goals: Iterable[State]|None) -> LandmarkProblem: Return the problem with the landmark heuristic.
+    """
+    def __init__(self, problem: SearchProblem, n_landmarks: int = 8, selection: str = "avoid", seed: int|None = None) -> None:
+        if selection not in ("farthest", "avoid"):
+            raise ValueError(f"Unknown selection {selection}")
+        self.base = problem
+        self.directed = isinstance(problem, BiSearchProblem)
+        self.rng = random.Random(seed)
+        distances, _ = shortest_distances(problem, problem.initial_state())
+        self.states: List[State] = list(distances)
+        self.index: Dict[State, int] = {state: i for i, state in enumerate(self.states)}
+        self.landmarks: List[State] = []
+        self.forward = np.empty((len(self.states), 0), dtype=np.float32)
+        self.backward = np.empty((len(self.states), 0), dtype=np.float32)
+        self.errors = np.zeros(len(self.states))
+        # a random root of the avoid selection may be surrounded by landmarks already, then another root is tried
+        attempts = 4 * n_landmarks
+        while len(self.landmarks) < min(n_landmarks, len(self.states)) and attempts > 0:
+            attempts -= 1
+            landmark = self._farthest() if selection == "farthest" else self._avoid()
+            if landmark is not None and landmark not in self.landmarks:
+                self._add(landmark)
+            elif selection == "farthest":
+                break
+
+    def _table(self, distances: Dict[State, float]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the column of the distances as float32 rounded down, and how much every row was rounded down by."""
+        column = np.full((len(self.states), 1), np.inf)
+        for state, distance in distances.items():
+            i = self.index.get(state)
+            if i is not None:
+                column[i, 0] = distance
+        table = column.astype(np.float32)
+        # rounding to the nearest float32 can overestimate a distance, and then the bounds using it as d(L, goal)
+        above = table > column
+        table[above] = np.nextafter(table[above], np.float32(-np.inf))
+        with np.errstate(invalid="ignore"):
+            errors = np.where(np.isfinite(column), column - table, 0.0)[:, 0]
+        return table, errors
+
+    def _add(self, landmark: State) -> None:
+        forward, errors = self._table(shortest_distances(self.base, landmark)[0])
+        if self.directed:
+            backward, backward_errors = self._table(shortest_distances(self.base, landmark, reverse=True)[0])
+            errors = np.maximum(errors, backward_errors)
+        else:
+            backward = forward
+        self.landmarks.append(landmark)
+        self.forward = np.hstack([self.forward, forward])
+        self.backward = np.hstack([self.backward, backward])
+        self.errors = np.maximum(self.errors, errors)
+
+    def _farthest(self) -> State|None:
+        """Return the state farthest from the landmarks (from the initial state for the first one), among those they reach."""
+        if not self.landmarks:
+            distances = self._table(shortest_distances(self.base, self.states[0])[0])[0][:, 0]
+        else:
+            distances = self.forward.min(axis=1)
+        reachable = np.flatnonzero(np.isfinite(distances))
+        if len(reachable) == 0:
+            return None
+        return self.states[reachable[np.argmax(distances[reachable])]]
+
+    def _avoid(self) -> State|None:
+        """
+        Grow a shortest-path tree from a random root, weigh every state by how much the current landmarks underestimate
+        its distance, and descend from the root into the heaviest subtree without a landmark until a leaf.
+        """
+        root = self.rng.choice(self.states)
+        distances, predecessors = shortest_distances(self.base, root)
+        children: Dict[State, List[State]] = {}
+        for state, (parent, _) in predecessors.items():
+            if parent is not None:
+                children.setdefault(parent, []).append(state)
+        landmarks = set(self.landmarks)
+        sizes: Dict[State, float] = {}
+        covered = set()
+        stack = [(root, False)]
+        while stack:
+            state, children_done = stack.pop()
+            if not children_done:
+                stack.append((state, True))
+                stack.extend((child, False) for child in children.get(state, ()))
+                continue
+            kids = children.get(state, ())
+            if state in landmarks or any(child in covered for child in kids):
+                # a subtree holding a landmark is already well covered
+                covered.add(state)
+                sizes[state] = 0.0
+            else:
+                sizes[state] = distances[state] - self._bound(root, state) + sum(sizes[child] for child in kids)
+        state = root
+        while True:
+            best = max(children.get(state, ()), key=lambda child: sizes[child], default=None)
+            if best is None or sizes[best] <= 0:
+                break
+            state = best
+        return None if state == root and state in covered else state
+
+    def _bound(self, state: State, goal: State) -> float:
+        if not self.landmarks:
+            return 0.0
+        return max(self.bound(state, goal), 0.0)
+
+    def bound(self, state: State, goal: State) -> float:
+        """Return max over the landmarks L of d(L, goal) - d(L, state) and d(state, L) - d(goal, L), or 0 if a state is unknown."""
+        i, j = self.index.get(state), self.index.get(goal)
+        if i is None or j is None or not self.landmarks:
+            return 0.0
+        # the rounding error of the subtracted distance is taken off, the other one is never overestimated
+        with np.errstate(invalid="ignore"):
+            bounds = np.fmax(self.forward[j] - self.forward[i].astype(np.float64) - self.errors[i],
+                             self.backward[i].astype(np.float64) - self.backward[j] - self.errors[j])
+        bound = np.fmax.reduce(bounds)
+        return 0.0 if np.isnan(bound) else max(float(bound), 0.0)
+
+    def problem_to(self, goals: Iterable[State]|None = None) -> "LandmarkProblem":
+        """Return the problem with the landmark heuristic toward the given goals, by default its reachable goal states."""
+        if goals is None:
+            goals = [state for state in self.states if self.base.is_goal(state)]
+        return LandmarkProblem(self, goals)
+
+class LandmarkProblem(HeuristicSearchProblem):
+    """
+    LandmarkProblem class wraps a search problem with the ALT heuristic: the least landmark bound over the goals.
+
+    Args:
+        landmarks (Landmarks): The precomputed landmark tables of the problem.
+        goals (Iterable[State]): The goal states the heuristic estimates the distance to.
+    """
+    def __init__(self, landmarks: Landmarks, goals: Iterable[State]) -> None:
+        self.landmarks = landmarks
+        self.problem = landmarks.base
+        self.symmetric = getattr(self.problem, "symmetric", False)
+        rows = [landmarks.index[goal] for goal in goals if goal in landmarks.index]
+        # the columns of every goal, so the bound toward all goals is one vectorized operation
+        self._goal_forward = landmarks.forward[rows]
+        self._goal_backward = landmarks.backward[rows]
+        self._goal_errors = landmarks.errors[rows, None]
+
+    def __getattr__(self, name: str):
+        # the other methods of the problem, e.g. those of a BiSearchProblem
+        if name == "problem":
+            raise AttributeError(name)
+        return getattr(self.problem, name)
+
+    def initial_state(self) -> State:
+        return self.problem.initial_state()
+
+    def actions(self, state: State) -> list[Action]:
+        return self.problem.actions(state)
+
+    def result(self, state: State, action: Action) -> State:
+        return self.problem.result(state, action)
+
+    def is_goal(self, state: State) -> bool:
+        return self.problem.is_goal(state)
+
+    def action_cost(self, s: State, action: Action) -> int|float:
+        return self.problem.action_cost(s, action)
+
+    def symmetries(self, state: State) -> Iterable[State]:
+        return self.problem.symmetries(state)
+
+    def canonicalize(self, state: State):
+        return self.problem.canonicalize(state)
+
+    def heuristic(self, state: State) -> float:
+        i = self.landmarks.index.get(state)
+        if i is None or len(self._goal_forward) == 0 or not self.landmarks.landmarks:
+            return 0.0
+        with np.errstate(invalid="ignore"):
+            bounds = np.fmax(self._goal_forward - self.landmarks.forward[i].astype(np.float64) - self.landmarks.errors[i],
+                             self.landmarks.backward[i].astype(np.float64) - self._goal_backward - self._goal_errors)
+        # nan comes from two infinite distances, which bound nothing
+        per_goal = np.fmax.reduce(bounds, axis=1)
+        return max(float(np.where(np.isnan(per_goal), 0.0, per_goal).min()), 0.0)
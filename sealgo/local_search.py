@@ -1,15 +1,20 @@
 from abc import abstractmethod
+import heapq
+import pickle
 import random
+import time
 from math import exp, tanh
-from typing import List, Type, Callable
+from typing import Dict, Generator, List, Type, Callable
 
-from .problem import HeuristicSearchProblem, Action
+from .problem import HeuristicSearchProblem, State, Action
+from .search import Stepwise
 
-class LocalSearch():
+class LocalSearch(Stepwise):
     @abstractmethod
     def __init__(self, problem: HeuristicSearchProblem, max_iter: int = 1000) -> None:
         self.problem = problem
         self.max_iter = max_iter
+        self.rng = random.Random()
         self._init()
         
     def _init(self) -> None:
@@ -26,13 +31,13 @@ class HillClimbing(LocalSearch):
         super().__init__(problem, max_iter)
     
     def search(self) -> List[List[Action]]:
+        return self._run(self._steps())
+    
+    def _steps(self) -> Generator[None, None, List[List[Action]]]:
         solutions = []
         for _ in range(self.max_iter):
-            actions = self.problem.actions(self.state)
-            if not actions:
-                self._init()
-                continue
-            chosen_action = self.climb(actions)
+            yield
+            chosen_action = self.climb()
             if not chosen_action:
                 continue
             # print(f"Solution: {chosen_action}\nFrom:\n{self.state}\nTo:\n{self.problem.result(self.state, chosen_action)}\n")
@@ -46,12 +51,21 @@ class HillClimbing(LocalSearch):
                 continue
         return solutions
     
-    def climb(self, actions: list[Action]) -> Action|None:
-        """Execute a hill climbing search algorithm pattern to return an action and decide whether to end."""
-        action = min(actions, key=lambda a: self.problem.heuristic(self.problem.result(self.state, a)))
+    def climb(self) -> Action|None:
+        """
+        Execute a hill climbing search algorithm pattern to return an action and decide whether to end.
+        The neighbourhood is walked lazily with problem.iter_actions, and a dead end restarts the search.
+        """
+        action, h_after = None, float('inf')
+        for a in self.problem.iter_actions(self.state):
+            h = self.problem.heuristic(self.problem.result(self.state, a))
+            if action is None or h < h_after:
+                action, h_after = a, h
+        if action is None:
+            self._init()
+            return None
         # print(f"From:\n{self.state}\nTo:\n{self.problem.result(self.state, action)}\n")
         h_before = self.problem.heuristic(self.state)
-        h_after = self.problem.heuristic(self.problem.result(self.state, action))
         # print(f"Before: {h_before}, After: {h_after}")
         slope = h_after - h_before
         if slope >= 0:
@@ -71,7 +85,7 @@ class StochasticHillClimbing(HillClimbing):
         p (Callable): The probability function to determine whether to accept a move.
     
     Methods:
-        climb(actions: list[Action]) -> Action: Selects an action to climb based on the stochastic hill climbing algorithm.
+        climb() -> Action: Selects an action to climb based on the stochastic hill climbing algorithm.
     """
     def __init__(self, problem: HeuristicSearchProblem, 
                  max_iter: int = 1000, 
@@ -79,30 +93,47 @@ class StochasticHillClimbing(HillClimbing):
         super().__init__(problem, max_iter)
         self.p = p
         
-    def climb(self, actions: list[Action]) -> Action|None:
+    def climb(self) -> Action|None:
         """
         Selects an action to climb based on the stochastic hill climbing algorithm.
-        
-        Args:
-            actions (list[Action]): The available actions to choose from.
-        
+        Only one action is drawn per step, with problem.sample_action.
+
         Returns:
             Action: The selected action to climb.
         """
-        action = random.choice(actions)
+        action = self.problem.sample_action(self.state, self.rng)
+        if action is None:
+            self._init()
+            return None
         h_before = self.problem.heuristic(self.state)
         h_after = self.problem.heuristic(self.problem.result(self.state, action))
         slope = h_after - h_before
         prob = self.p(slope)
-        if random.random() < prob:
+        if self.rng.random() < prob:
             return action
         else:
             return None
-    
+
 class FirstChoiceHillClimbing(StochasticHillClimbing):
+    """
+    First-choice Hill Climbing walks the neighbourhood lazily in a random order
+    (problem.iter_actions with an rng) and takes the first improving action.
+    """
     def __init__(self, problem: HeuristicSearchProblem, max_iter: int = 1000) -> None:
         super().__init__(problem, max_iter, p=lambda x: 1 if x < 0 else 0)
-        
+
+    def climb(self) -> Action|None:
+        h_before = self.problem.heuristic(self.state)
+        has_actions = False
+        for action in self.problem.iter_actions(self.state, self.rng):
+            has_actions = True
+            h_after = self.problem.heuristic(self.problem.result(self.state, action))
+            if self.p(h_after - h_before):
+                return action
+        if not has_actions:
+            self._init()
+        return None
+
 class SimulatedAnnealing(StochasticHillClimbing):
     def __init__(self, problem: HeuristicSearchProblem, max_iter: int = 1000, T_0: float = 100.0, alpha: float = 0.9) -> None:
         super().__init__(problem, max_iter, self.p)
@@ -129,16 +160,148 @@ class RandomRestart(LocalSearch):
         self.kwargs = kwargs
         
     def search(self) -> List[List[Action]]:
+        return self._run(self._steps())
+    
+    def _steps(self) -> Generator[None, None, List[List[Action]]]:
         for _ in range(self.max_restarts):
             if self.args:
                 search = self.algorithm(self.problem, self.max_iter, self.args, self.kwargs)
             else:
                 search = self.algorithm(self.problem, self.max_iter)
-            solutions = search.search()
+            solutions = yield from search._steps()
             if len(solutions) > 0:
                 self.solutions += solutions
         return self.solutions
     
+class LRTAStar(LocalSearch):
+    """
+    LRTAStar class represents Learning Real-Time A* with a local search space (LSS-LRTA*).
+    Before every move, an A* bounded by lookahead expansions (and the time budget) builds the local search space
+    around the agent, the learned heuristic of its states is raised by a Dijkstra-like Bellman update from the
+    frontier, and the agent moves toward the frontier state of least f = g + h.
+    The learned heuristic persists between trials (calls to search), so repeated trials converge to optimal paths.
+
+    Args:
+        problem (HeuristicSearchProblem): The search problem, its heuristic must be admissible.
+        max_iter (int, optional): The maximum number of moves of a trial. Defaults to 100000.
+        lookahead (int, optional): The most states expanded before a move, 1 is the plain LRTA*. Defaults to 1.
+        time_limit (int|float|None, optional): The time budget of the lookahead of a move in milliseconds,
+            at least one state is expanded. Defaults to None.
+        h_table (Dict[State, int|float]|None, optional): The learned heuristic of previous trials. Defaults to None.
+
+    Attributes:
+        h_table (Dict[State, int|float]): The learned heuristic of the states whose estimate was raised.
+
+    Methods:
+        search(): Run a trial from the initial state and return its path if it reached a goal.
+        plan() -> list[Action]: Look ahead and learn from the current state, return the actions of the next moves.
+        save(path: str): Save the learned heuristic with pickle.
+        load(path: str) -> Dict[State, int|float]: Load a learned heuristic to pass as h_table.
+    """
+    def __init__(self, problem: HeuristicSearchProblem, max_iter: int = 100000, lookahead: int = 1,
+                 time_limit: int|float|None = None, h_table: Dict[State, int|float]|None = None) -> None:
+        super().__init__(problem, max_iter)
+        if lookahead < 1:
+            raise ValueError("Lookahead must be at least one")
+        self.lookahead = lookahead
+        self.time_limit = time_limit
+        self.h_table: Dict[State, int|float] = {} if h_table is None else h_table
+
+    def h(self, state: State) -> int|float:
+        value = self.h_table.get(state)
+        return self.problem.heuristic(state) if value is None else value
+
+    def search(self) -> List[List[Action]]:
+        return self._run(self._steps())
+
+    def _steps(self) -> Generator[None, None, List[List[Action]]]:
+        self._init()
+        for _ in range(self.max_iter):
+            if self.problem.is_goal(self.state):
+                return [self.solution]
+            actions = self.plan()
+            if not actions:
+                return []
+            for action in actions:
+                self.cost += self.problem.action_cost(self.state, action)
+                self.state = self.problem.result(self.state, action)
+                self.solution.append(action)
+            yield
+        return [self.solution] if self.problem.is_goal(self.state) else []
+
+    def plan(self) -> List[Action]:
+        start = self.state
+        deadline = None if self.time_limit is None else time.time() + self.time_limit / 1000
+        # A* lookahead: the closed states form the local search space
+        g_costs = {start: 0}
+        parents: Dict[State, tuple] = {start: (None, None)}
+        edges: Dict[State, list] = {}
+        frontier = [(self.h(start), 0, 0, start)]
+        counter = 1
+        while frontier and len(edges) < self.lookahead:
+            if edges and deadline is not None and time.time() > deadline:
+                break
+            _, g, _, state = heapq.heappop(frontier)
+            if state in edges or g > g_costs[state]:
+                continue
+            if self.problem.is_goal(state):
+                heapq.heappush(frontier, (g, g, counter, state))
+                break
+            edges[state] = []
+            for action in self.problem.actions(state):
+                next_state = self.problem.result(state, action)
+                cost = self.problem.action_cost(state, action)
+                edges[state].append((next_state, cost))
+                if g + cost < g_costs.get(next_state, float('inf')):
+                    g_costs[next_state] = g + cost
+                    parents[next_state] = (state, action)
+                    heapq.heappush(frontier, (g + cost + self.h(next_state), g + cost, counter, next_state))
+                    counter += 1
+        frontier = [entry for entry in frontier if entry[3] not in edges and entry[1] == g_costs[entry[3]]]
+        if not frontier:
+            self.h_table[start] = float('inf')
+            return []
+        self._learn(edges, frontier)
+        target = min(frontier)[3]
+        actions = []
+        while target != start:
+            target, action = parents[target]
+            actions.append(action)
+        actions.reverse()
+        return actions
+
+    def _learn(self, edges: Dict[State, list], frontier: list) -> None:
+        """Raise h of the local search space to min(cost + h(next state)), propagated from the frontier like Dijkstra."""
+        old = {state: self.h(state) for state in edges}
+        predecessors: Dict[State, list] = {}
+        for state, successors in edges.items():
+            for next_state, cost in successors:
+                predecessors.setdefault(next_state, []).append((state, cost))
+        learned = {state: float('inf') for state in edges}
+        queue = [(self.h(entry[3]), i, entry[3]) for i, entry in enumerate(frontier)]
+        heapq.heapify(queue)
+        counter = len(queue)
+        while queue:
+            h, _, state = heapq.heappop(queue)
+            if state in learned and h > learned[state]:
+                continue
+            for predecessor, cost in predecessors.get(state, ()):
+                if h + cost < learned[predecessor]:
+                    learned[predecessor] = h + cost
+                    heapq.heappush(queue, (h + cost, counter, predecessor))
+                    counter += 1
+        for state, value in learned.items():
+            self.h_table[state] = max(old[state], value)
+
+    def save(self, path: str) -> None:
+        with open(path, 'wb') as f:
+            pickle.dump(self.h_table, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path: str) -> Dict[State, int|float]:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    
 # TODO
 # class LocalBeamSearch(LocalSearch):
 #     def __init__(self, problem: HeuristicSearchProblem, k:int=8, max_iter: int = 1000):
@@ -214,26 +377,3 @@ class RandomRestart(LocalSearch):
 #                 self.state = next(filter(lambda x: self.problem.is_goal(x), self.population))
 #                 return True
 #         return False
-    
-# class LRTSAStar(LocalSearch):
-#     ''' Learning Real-time A* Algorithm '''
-#     def __init__(self, problem: HeuristicSearchProblem, max_iter: int = 100000, pop_size: int = 100, mutation_rate: float = 0.1):
-#         super().__init__(problem, max_iter)
-#         self.approx_costs = {}
-        
-#     def approx_h(self, state: State) -> int:
-#         if state not in self.approx_costs:
-#             self.approx_costs[state] = problem.heuristic(state)
-#         return self.approx_costs[state]
-        
-#     def search(self) -> Optional[State]:
-#         for _ in range(self.max_iter):
-#             if self.problem.is_goal(self.state):
-#                 return self.state
-#             actions = self.problem.actions(self.state)
-#             if not actions:
-#                 return None
-#             action = min(actions, key=lambda n: self.approx_h(self.problem.result(self.state, n)))
-#             self.state = self.problem.result(self.state, action)
-#             self.approx_costs[self.state] += self.state.cost
-#         return self.state if self.problem.is_goal(self.state) else None
\ No newline at end of file
@@ -1,22 +1,26 @@
 import time
 import math
 import random
-from typing import List, Callable
+from typing import Dict, Generator, Hashable, Iterator, List, Callable
 
 from .search import Search
 from .problem import State, Action, SearchProblem
 
 class MCTSNode:
-    def __init__(self, state, parent=None, action=None, path_cost=0):
+    def __init__(self, state, parent=None, action=None, path_cost=0, is_terminal=False):
         self.state = state
         self.parent = parent
+        self.action = action
+        self.path_cost = path_cost
         self.children = {}
+        self.child_keys = set() # canonical forms of the children, for symmetric problems
+        self.skipped_actions = set() # actions leading to an image of an existing child
+        self.untried = None # the actions not expanded yet, drawn from by expand
         self.num_visits = 0
         self.total_reward = 0
-        self.is_terminal = parent.problem.is_goal(state)
+        self.is_terminal = is_terminal
         self.is_fully_expanded = self.is_terminal
-        if parent:
-            self.depth = parent.depth + 1
+        self.depth = parent.depth + 1 if parent else 0
 
     def __repr__(self):
         return f"<Node {self.state}>"
@@ -28,7 +32,7 @@ class MCTSNode:
     def child_node(self, problem: SearchProblem, action):
         next_state = problem.result(self.state, action)
         return MCTSNode(next_state, self, action,
-                    problem.action_cost(self.state, action))
+                    problem.action_cost(self.state, action), problem.is_goal(next_state))
 
     def solution(self):
         return [node.action for node in self.path()[1:]]
@@ -41,8 +45,53 @@ class MCTSNode:
         return list(reversed(path_back))
 
 class MCTS(Search):
+    """
+    MCTS class represents Monte Carlo Tree Search with UCT: every round selects a leaf, expands one of its
+    untried actions, rolls out from the new node and backs the reward up.
+
+    A rollout walks actions drawn with problem.sample_action until a goal, whose reward is
+    problem.action_cost(goal, Action.STAY), or until max_rollout_depth actions, whose reward is leaf_value(state).
+    With batch_size > 1, a round selects batch_size leaves, counting their visits at once so that they differ,
+    and rolls them out together with batch_rollout_policy, which a vectorized environment can replace to step
+    all the simulations at once. With cache_rollouts, the reward of the first rollout from a state is reused
+    for the next leaves holding that state.
+
+    The untried actions of a node are drawn once from problem.iter_actions, or ranked once by action_cost + heuristic
+    of their result with rank_actions (by action_cost alone if the problem has no heuristic), and expanded in that order.
+    With progressive widening, a node gets a new child only while it has fewer than
+    max(1, widening_constant * visits ** widening_exponent), so that nodes with many actions are searched deeper
+    rather than only widened.
+
+    Args:
+        problem (SearchProblem): The search problem.
+        time_limit (int|None, optional): The time limit in milliseconds. Defaults to None.
+        iteration_limit (int|None, optional): The number of rounds. Defaults to None.
+        exploration_constant (float, optional): The exploration constant of UCT. Defaults to 1 / sqrt(2).
+        rollout_policy (Callable[[State], int|float]|None, optional): The reward of a rollout from a state. Defaults to default_rollout_policy.
+        max_rollout_depth (int|None, optional): The most actions of a rollout, None for no limit. Defaults to None.
+        leaf_value (Callable[[State], int|float]|None, optional): The reward of a rollout cut off in a state.
+            Defaults to -problem.heuristic(state) if the problem has a heuristic, else 0.
+        batch_size (int, optional): The number of leaves selected and rolled out per round. Defaults to 1.
+        batch_rollout_policy (Callable[[List[State]], List[int|float]]|None, optional): The rewards of the rollouts
+            from a batch of states, not to be given with rollout_policy when batch_size > 1. Defaults to rollout_policy
+            called on every state if it is given, else default_batch_rollout_policy.
+        cache_rollouts (bool, optional): Whether to reuse the reward of a state rolled out before. Defaults to False.
+        rank_actions (bool, optional): Whether to expand the actions of least cost + heuristic first, or of least cost
+            if the problem has no heuristic. Defaults to False.
+        widening_constant (float|None, optional): The constant of progressive widening, None for none. Defaults to None.
+        widening_exponent (float, optional): The exponent of progressive widening. Defaults to 0.5.
+
+    Attributes:
+        root (MCTSNode|None): The root of the tree of the last search.
+        rounds (int): The number of rounds of the last search.
+        rollout_cache (Dict[Hashable, int|float]): With cache_rollouts, the reward of the states rolled out.
+    """
     def __init__(self, problem: SearchProblem, time_limit=None, iteration_limit=None, exploration_constant=1 / math.sqrt(2),
-                 rollout_policy: Callable[[State], int|float] = None) -> None:
+                 rollout_policy: Callable[[State], int|float] = None, max_rollout_depth: int|None = None,
+                 leaf_value: Callable[[State], int|float]|None = None, batch_size: int = 1,
+                 batch_rollout_policy: Callable[[List[State]], List[int|float]]|None = None,
+                 cache_rollouts: bool = False, rank_actions: bool = False, widening_constant: float|None = None,
+                 widening_exponent: float = 0.5) -> None:
         super().__init__(problem)
         if time_limit is not None:
             if iteration_limit is not None:
@@ -58,54 +107,237 @@ class MCTS(Search):
             self.limit_type = 'iterations'
         self.exploration_constant = exploration_constant
         self.rollout_policy = rollout_policy or self.default_rollout_policy
+        if batch_size < 1:
+            raise ValueError("Batch size must be at least one")
+        self.max_rollout_depth = max_rollout_depth
+        if leaf_value is None:
+            leaf_value = (lambda state: -problem.heuristic(state)) if hasattr(problem, "heuristic") else (lambda state: 0)
+        self.leaf_value = leaf_value
+        self.batch_size = batch_size
+        if batch_rollout_policy is None:
+            if rollout_policy is None:
+                batch_rollout_policy = self.default_batch_rollout_policy
+            else:
+                batch_rollout_policy = lambda states: [rollout_policy(state) for state in states]
+        elif rollout_policy is not None and batch_size > 1:
+            raise ValueError("A rollout policy is not used when rolling out batches with a batch rollout policy")
+        self.batch_rollout_policy = batch_rollout_policy
+        self.cache_rollouts = cache_rollouts
+        self.rollout_cache: Dict[Hashable, int|float] = {}
+        self.rng = random.Random()
+        self.rank_actions = rank_actions
+        self.widening_constant = widening_constant
+        self.widening_exponent = widening_exponent
+        # children that are images of each other under the symmetries of the problem are expanded once
+        self._key = problem.canonicalize if getattr(problem, "symmetric", False) else None
+        # the nodes of a compact problem hold encode(state), decoded when the node is expanded or rolled out
+        self._compact = getattr(problem, "compact", False)
+        self.root = None
+        self.rounds = 0
+        self._resume = False
 
     def default_rollout_policy(self, state: State) -> int|float:
+        depth = 0
         while not self.problem.is_goal(state):
-            actions = self.problem.actions(state)
-            if not actions:
-                raise Exception("Non-terminal state has no possible actions: " + str(state))
-            action = random.choice(actions)
-            state = self.problem.result(state, action)
+            if self.max_rollout_depth is not None and depth >= self.max_rollout_depth:
+                return self.leaf_value(state)
+            state = self._rollout_step(state)
+            depth += 1
         return self.problem.action_cost(state, Action.STAY)
 
+    def default_batch_rollout_policy(self, states: List[State]) -> List[int|float]:
+        """Roll out from all the states in lockstep, one action of every unfinished simulation per step."""
+        rewards: List[int|float] = [0] * len(states)
+        states = list(states)
+        active = range(len(states))
+        depth = 0
+        while active:
+            unfinished = []
+            for i in active:
+                state = states[i]
+                if self.problem.is_goal(state):
+                    rewards[i] = self.problem.action_cost(state, Action.STAY)
+                elif self.max_rollout_depth is not None and depth >= self.max_rollout_depth:
+                    rewards[i] = self.leaf_value(state)
+                else:
+                    states[i] = self._rollout_step(state)
+                    unfinished.append(i)
+            active = unfinished
+            depth += 1
+        return rewards
+
+    def _rollout_step(self, state: State) -> State:
+        action = self.problem.sample_action(state, self.rng)
+        if action is None:
+            raise Exception("Non-terminal state has no possible actions: " + str(state))
+        return self.problem.result(state, action)
+
     def search(self) -> List[List[Action]]:
-        self.root = MCTSNode(self.problem.initial_state(), None)
+        return self._run(self._steps())
+
+    def _steps(self) -> Generator[None, None, List[List[Action]]]:
+        if not self._resume:
+            init = self.problem.initial_state()
+            self.root = MCTSNode(self._stored(init), None, is_terminal=self.problem.is_goal(init))
+            self.rounds = 0
+        self._resume = False
         
         if self.limit_type == 'time':
             time_limit = time.time() + self.time_limit / 1000
             while time.time() < time_limit:
-                self.execute_round()
+                self._round()
+                yield
         else:
-            for _ in range(self.search_limit):
-                self.execute_round()
+            # a search restored from a checkpoint only runs the rounds it had left
+            while self.rounds < self.search_limit:
+                self._round()
+                yield
 
         best_child = self.get_best_child(self.root, 0)
         action = next(action for action, node in self.root.children.items() if node is best_child)
         return [self._reconstruct_path(best_child)]
 
+    def _round(self) -> None:
+        if self.checkpoint is not None:
+            self.checkpoint.tick(self)
+        self.execute_round()
+        self.rounds += 1
+
+    def _checkpoint_state(self) -> dict:
+        return {"rounds": self.rounds, "nodes": self._flatten(), "rollout_cache": self.rollout_cache}
+
+    def _flatten(self):
+        """Yield the nodes of the tree breadth first, each with the index of its parent, so no recursion is needed."""
+        queue = [self.root]
+        index = {id(self.root): -1}
+        i = 0
+        while i < len(queue):
+            node = queue[i]
+            yield (index[id(node)], node.action, node.state, node.path_cost, node.num_visits, node.total_reward,
+                   node.is_terminal, node.is_fully_expanded, node.child_keys, node.skipped_actions)
+            for child in node.children.values():
+                index[id(child)] = i
+                queue.append(child)
+            i += 1
+
+    def _restore_state(self, tables: dict) -> None:
+        nodes: List[MCTSNode] = []
+        for parent, action, state, path_cost, num_visits, total_reward, is_terminal, fully_expanded, child_keys, skipped in tables["nodes"]:
+            node = MCTSNode(state, nodes[parent] if parent >= 0 else None, action, path_cost, is_terminal)
+            node.num_visits, node.total_reward = num_visits, total_reward
+            node.is_fully_expanded, node.child_keys, node.skipped_actions = fully_expanded, child_keys, skipped
+            if node.parent is not None:
+                node.parent.children[action] = node
+            nodes.append(node)
+        self.root = nodes[0]
+        self.rounds = tables["rounds"]
+        self.rollout_cache = tables.get("rollout_cache", {})
+        self._resume = True
+
+    def _stored(self, state: State) -> State|int|bytes:
+        return self.problem.encode(state) if self._compact else state
+
+    def _loaded(self, item: State|int|bytes) -> State:
+        return self.problem.decode(item) if self._compact else item
+
     def execute_round(self) -> None:
+        if self.batch_size > 1:
+            return self._execute_batch()
         node = self.select_node(self.root)
-        reward = self.rollout_policy(node.state)
+        if not self.cache_rollouts:
+            reward = self.rollout_policy(self._loaded(node.state))
+        else:
+            key = self._cache_key(node)
+            reward = self.rollout_cache.get(key)
+            if reward is None:
+                reward = self.rollout_cache[key] = self.rollout_policy(self._loaded(node.state))
         self.backpropagate(node, reward)
 
+    def _execute_batch(self) -> None:
+        nodes = []
+        for _ in range(self.batch_size):
+            node = self.select_node(self.root)
+            # the visit is counted now, so the next selections see it, and the reward added once rolled out
+            self.backpropagate(node, 0)
+            nodes.append(node)
+        rewards: Dict[Hashable, int|float] = {}
+        batch: Dict[Hashable, MCTSNode] = {}
+        keys = []
+        for node in nodes:
+            key = self._cache_key(node) if self.cache_rollouts else id(node)
+            keys.append(key)
+            if key in rewards or key in batch:
+                continue
+            if self.cache_rollouts and key in self.rollout_cache:
+                rewards[key] = self.rollout_cache[key]
+            else:
+                batch[key] = node
+        if batch:
+            results = self.batch_rollout_policy([self._loaded(node.state) for node in batch.values()])
+            for key, reward in zip(batch, results):
+                rewards[key] = reward
+                if self.cache_rollouts:
+                    self.rollout_cache[key] = reward
+        for node, key in zip(nodes, keys):
+            reward = rewards[key]
+            while node is not None:
+                node.total_reward += reward
+                node = node.parent
+
+    def _cache_key(self, node: "MCTSNode") -> Hashable:
+        """Return the key of the state of the node in the rollout cache, its canonical form for symmetric problems."""
+        if self._key is not None:
+            return self._key(self._loaded(node.state))
+        return node.state
+
     def select_node(self, node: "MCTSNode") -> "MCTSNode":
         while not node.is_terminal:
-            if node.is_fully_expanded:
-                node = self.get_best_child(node, self.exploration_constant)
-            else:
-                return self.expand(node)
+            if not node.is_fully_expanded and self._may_widen(node):
+                new_node = self.expand(node)
+                if new_node is not None:
+                    return new_node
+            node = self.get_best_child(node, self.exploration_constant)
         return node
 
-    def expand(self, node: "MCTSNode") -> "MCTSNode":
-        actions = self.problem.actions(node.state)
-        for action in actions:
-            if action not in node.children:
-                new_node = MCTSNode(self.problem.result(node.state, action), node)
-                node.children[action] = new_node
-                if len(actions) == len(node.children):
-                    node.is_fully_expanded = True
-                return new_node
-        raise Exception("Should never reach here")
+    def _may_widen(self, node: "MCTSNode") -> bool:
+        """Return whether progressive widening lets the node get one more child."""
+        if self.widening_constant is None or not node.children:
+            return True
+        return len(node.children) < self.widening_constant * node.num_visits ** self.widening_exponent
+
+    def _untried_actions(self, state: State, node: "MCTSNode") -> Iterator[Action]:
+        """Return the actions of the node without a child yet, lazily unless they are ranked."""
+        actions = (action for action in self.problem.iter_actions(state)
+                   if action not in node.children and action not in node.skipped_actions)
+        if not self.rank_actions:
+            return actions
+        if not hasattr(self.problem, "heuristic"):
+            return iter(sorted(actions, key=lambda action: self.problem.action_cost(state, action)))
+        return iter(sorted(actions, key=lambda action: self.problem.action_cost(state, action)
+                           + self.problem.heuristic(self.problem.result(state, action))))
+
+    def expand(self, node: "MCTSNode") -> "MCTSNode|None":
+        """Add a child for the next untried action, or mark the node fully expanded and return None if only images of existing children are left."""
+        state = self._loaded(node.state)
+        if node.untried is None:
+            node.untried = self._untried_actions(state, node)
+        for action in node.untried:
+            next_state = self.problem.result(state, action)
+            if self._key is not None:
+                key = self._key(next_state)
+                if key in node.child_keys:
+                    node.skipped_actions.add(action)
+                    continue
+                node.child_keys.add(key)
+            new_node = MCTSNode(self._stored(next_state), node, action,
+                                self.problem.action_cost(state, action), self.problem.is_goal(next_state))
+            node.children[action] = new_node
+            return new_node
+        if not node.children:
+            raise Exception("Non-terminal state has no possible actions: " + str(state))
+        node.is_fully_expanded = True
+        node.untried = None
+        return None
 
     def backpropagate(self, node: "MCTSNode", reward: int|float) -> None:
         while node is not None:
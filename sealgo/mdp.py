@@ -0,0 +1,423 @@
+import heapq
+from array import array
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .problem import UncertainSearchProblem, State, Action
+from .and_or_search import ConditionalPlan
+from .csr import gather
+
+def _q(costs: np.ndarray, self_probs: np.ndarray, entry_rows: np.ndarray, probs: np.ndarray,
+       indices: np.ndarray, values: np.ndarray, gamma: float) -> np.ndarray:
+    """
+    Return the expected cost of rows. The probability of staying in the same state is solved in closed form,
+    q = (cost + gamma * sum(p * v)) / (1 - gamma * p_stay), which has the same fixed point as the plain update.
+    """
+    sums = np.bincount(entry_rows, weights=probs * values[indices], minlength=len(costs))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        q = (costs + gamma * sums) / (1 - gamma * self_probs)
+    q[np.isnan(q)] = np.inf
+    return q
+
+def _residual(new: np.ndarray, old: np.ndarray) -> float:
+    """Return the largest change between two arrays of values, which may hold inf."""
+    if len(new) == 0:
+        return 0.0
+    with np.errstate(invalid="ignore"):
+        diff = np.abs(new - old)
+    diff[new == old] = 0.0
+    return float(diff.max())
+
+class MDP:
+    """
+    An explicit Markov decision process: the reachable states of an UncertainSearchProblem are numbered once,
+    and the outcomes of every (state, action) pair, a row, are stored as a CSR matrix in NumPy arrays.
+    Values are expected costs to reach a goal, goal states are absorbing with value 0.
+
+    Attributes:
+        states (List[State]): The state of every ID, 0 is the initial state.
+        index (Dict[State, int]): The ID of every state.
+        actions (List[Action]): The action of every row.
+        row_ptr (np.ndarray): The rows of state i are row_ptr[i]:row_ptr[i+1].
+        row_state (np.ndarray): The state of every row.
+        costs (np.ndarray): The cost of every row.
+        self_probs (np.ndarray): The probability of every row to stay in its state, kept out of the matrix.
+        indptr, indices, probs (np.ndarray): The CSR matrix of probabilities from rows to other states.
+        entry_row (np.ndarray): The row of every entry of the matrix.
+        goals (np.ndarray): Whether every state is a goal state.
+
+    Methods:
+        from_problem(problem: UncertainSearchProblem, max_states: int|None): Enumerate the states reachable from the initial state.
+        q_values(values, gamma, r0, r1) -> np.ndarray: Return the expected cost of the rows r0:r1.
+        bellman(values, gamma, lo, hi) -> np.ndarray: Return the Bellman update of the values of the states lo:hi.
+        greedy(values, gamma) -> np.ndarray: Return the best row of every state, -1 if it has none.
+        goal_distances() -> np.ndarray: Return the least number of steps from every state to a goal, -1 if there is none.
+        initial_values() -> np.ndarray: Return 0, or inf for the states that cannot reach a goal.
+        safe_policy(proper) -> np.ndarray: Return a row of every state that never risks an infinite value, -1 if it has none.
+        plan(policy, values) -> ConditionalPlan|None: Return the plan of a policy from the initial state.
+    """
+    def __init__(self, states: List[State], actions: List[Action], row_ptr: np.ndarray, costs: np.ndarray, self_probs: np.ndarray,
+                 indptr: np.ndarray, indices: np.ndarray, probs: np.ndarray, goals: np.ndarray) -> None:
+        self.states = states
+        self.index: Dict[State, int] = {state: i for i, state in enumerate(states)}
+        self.actions = actions
+        self.row_ptr = row_ptr
+        self.row_state = np.repeat(np.arange(len(states), dtype=np.int64), np.diff(row_ptr))
+        self.costs = costs
+        self.self_probs = self_probs
+        self.indptr = indptr
+        self.indices = indices
+        self.probs = probs
+        self.entry_row = np.repeat(np.arange(len(costs), dtype=np.int64), np.diff(indptr))
+        self.goals = goals
+        self._predecessors: Tuple[np.ndarray, np.ndarray]|None = None
+        self._goal_distances: np.ndarray|None = None
+
+    @classmethod
+    def from_problem(cls, problem: UncertainSearchProblem, max_states: int|None = None) -> "MDP":
+        """Enumerate the states reachable from the initial state breadth-first, merging repeated outcomes of an action."""
+        init = problem.initial_state()
+        states, index = [init], {init: 0}
+        actions: List[Action] = []
+        row_ptr, costs, self_probs = array('q', [0]), array('d'), array('d')
+        indptr, indices, probs = array('q', [0]), array('i'), array('d')
+        goals = array('b')
+        i = 0
+        while i < len(states):
+            state = states[i]
+            if problem.is_goal(state):
+                goals.append(1)
+                row_ptr.append(len(costs))
+                i += 1
+                continue
+            goals.append(0)
+            for action in problem.actions(state):
+                outcomes: Dict[int, float] = {}
+                for next_state, p in problem.result(state, action):
+                    if p <= 0:
+                        continue
+                    j = index.get(next_state)
+                    if j is None:
+                        if max_states is not None and len(states) >= max_states:
+                            raise MemoryError(f"More than {max_states} states are reachable")
+                        j = index[next_state] = len(states)
+                        states.append(next_state)
+                    outcomes[j] = outcomes.get(j, 0.0) + p
+                if not outcomes:
+                    continue
+                actions.append(action)
+                costs.append(problem.action_cost(state, action))
+                self_probs.append(outcomes.pop(i, 0.0))
+                indices.extend(outcomes.keys())
+                probs.extend(outcomes.values())
+                indptr.append(len(indices))
+            row_ptr.append(len(costs))
+            i += 1
+        return cls(states, actions, np.frombuffer(row_ptr, dtype=np.int64), np.frombuffer(costs, dtype=np.float64),
+                   np.frombuffer(self_probs, dtype=np.float64), np.frombuffer(indptr, dtype=np.int64),
+                   np.frombuffer(indices, dtype=np.int32), np.frombuffer(probs, dtype=np.float64),
+                   np.frombuffer(goals, dtype=np.int8).astype(bool))
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def q_values(self, values: np.ndarray, gamma: float = 1.0, r0: int = 0, r1: int|None = None) -> np.ndarray:
+        """Return the expected cost of the rows r0:r1 given the values of the states."""
+        r1 = len(self.costs) if r1 is None else r1
+        e0, e1 = self.indptr[r0], self.indptr[r1]
+        return _q(self.costs[r0:r1], self.self_probs[r0:r1], self.entry_row[e0:e1] - r0,
+                  self.probs[e0:e1], self.indices[e0:e1], values, gamma)
+
+    def bellman(self, values: np.ndarray, gamma: float = 1.0, lo: int = 0, hi: int|None = None) -> np.ndarray:
+        """Return the Bellman update of the values of the states lo:hi."""
+        hi = len(self.states) if hi is None else hi
+        r0, r1 = self.row_ptr[lo], self.row_ptr[hi]
+        updated = np.where(self.goals[lo:hi], 0.0, np.inf)
+        starts = self.row_ptr[lo:hi]
+        has_rows = self.row_ptr[lo + 1:hi + 1] > starts
+        if r1 > r0:
+            updated[has_rows] = np.minimum.reduceat(self.q_values(values, gamma, r0, r1), starts[has_rows] - r0)
+        return updated
+
+    def greedy(self, values: np.ndarray, gamma: float = 1.0) -> np.ndarray:
+        """Return the best row of every state given the values, the first one on ties, -1 if no row has a finite cost."""
+        policy = np.full(len(self.states), -1, dtype=np.int64)
+        if len(self.costs) == 0:
+            return policy
+        q = self.q_values(values, gamma)
+        has_rows = np.diff(self.row_ptr) > 0
+        best = np.minimum.reduceat(q, self.row_ptr[:-1][has_rows])
+        best_of_row = np.repeat(best, np.diff(self.row_ptr)[has_rows])
+        rows = np.flatnonzero((q == best_of_row) & (q < np.inf))
+        states, first = np.unique(self.row_state[rows], return_index=True)
+        policy[states] = rows[first]
+        return policy
+
+    def predecessors(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the CSR matrix (indptr, entries) of the matrix entries leading into every state."""
+        if self._predecessors is None:
+            order = np.argsort(self.indices, kind="stable")
+            counts = np.bincount(self.indices, minlength=len(self.states))
+            indptr = np.zeros(len(self.states) + 1, dtype=np.int64)
+            np.cumsum(counts, out=indptr[1:])
+            self._predecessors = (indptr, order)
+        return self._predecessors
+
+    def goal_distances(self) -> np.ndarray:
+        """Return the least number of steps from every state to a goal, by a breadth-first search backwards from the goals."""
+        if self._goal_distances is None:
+            pred_indptr, pred_entries = self.predecessors()
+            distances = np.full(len(self.states), -1, dtype=np.int64)
+            frontier = np.flatnonzero(self.goals)
+            distances[frontier] = 0
+            distance = 0
+            while len(frontier):
+                distance += 1
+                _, positions = gather(pred_indptr, frontier)
+                sources = np.unique(self.row_state[self.entry_row[pred_entries[positions]]])
+                frontier = sources[distances[sources] < 0]
+                distances[frontier] = distance
+            self._goal_distances = distances
+        return self._goal_distances
+
+    def initial_values(self) -> np.ndarray:
+        """Return the values to start solving from: 0, or inf for the states that cannot reach a goal."""
+        return np.where(self.goal_distances() < 0, np.inf, 0.0)
+
+    def safe_policy(self, proper: bool = True) -> np.ndarray:
+        """
+        Return a row of every state whose outcomes all have a finite value, -1 if it has none, so the value of the states
+        is finite under the policy with gamma < 1. With proper, the rows also reach a goal with probability 1, moving
+        closer to it with some probability at every step, so the value is finite with gamma = 1 too.
+        """
+        pred_indptr, pred_entries = self.predecessors()
+        alive = self.goal_distances() >= 0
+        while True:
+            # the rows risking a state of infinite value are dropped, then the states left without a row, until none is
+            risky = np.bincount(self.entry_row, weights=~alive[self.indices], minlength=len(self.costs)) > 0
+            safe = alive[self.row_state] & ~risky
+            policy = np.full(len(self.states), -1, dtype=np.int64)
+            if not proper:
+                rows = np.flatnonzero(safe)
+                states, first = np.unique(self.row_state[rows], return_index=True)
+                policy[states] = rows[first]
+                reached = self.goals | (policy >= 0)
+            else:
+                safe &= self.self_probs < 1
+                reached = self.goals.copy()
+                frontier = np.flatnonzero(self.goals)
+                while len(frontier):
+                    _, positions = gather(pred_indptr, frontier)
+                    rows = self.entry_row[pred_entries[positions]]
+                    rows = rows[safe[rows]]
+                    rows = rows[~reached[self.row_state[rows]]]
+                    frontier, first = np.unique(self.row_state[rows], return_index=True)
+                    policy[frontier] = rows[first]
+                    reached[frontier] = True
+            if np.array_equal(reached, alive):
+                return policy
+            alive = reached
+
+    def plan(self, policy: np.ndarray, values: np.ndarray|None = None) -> ConditionalPlan|None:
+        """Return the ConditionalPlan of the policy from the initial state, or None if it has no action there."""
+        if policy[0] < 0 and not self.goals[0]:
+            return None
+        def outcomes(state: State, action: Action) -> List[State]:
+            row = policy[self.index[state]]
+            return [self.states[j] for j in self.indices[self.indptr[row]:self.indptr[row + 1]]]
+        mapping = {state: None if policy[i] < 0 else self.actions[policy[i]] for i, state in enumerate(self.states)}
+        return ConditionalPlan.extract(self.states[0], mapping, outcomes, None if values is None else float(values[0]))
+
+class ValueIteration:
+    """
+    ValueIteration class solves an MDP for the least expected cost to a goal.
+
+    Args:
+        mdp (MDP): The explicit MDP.
+        gamma (float, optional): The discount factor. Defaults to 1.0.
+        epsilon (float, optional): The largest change of a value allowed at convergence. Defaults to 1e-6.
+        max_iter (int, optional): The maximum number of sweeps (of updates of single states in prioritized mode). Defaults to 100000.
+        mode (str, optional): "jacobi" updates all states at once from the old values, "gauss-seidel" updates blocks
+            of states in turn from the newest values, nearest to the goals first, "prioritized" updates one state at
+            a time in the order of its expected change (prioritized sweeping). Defaults to "jacobi".
+        block_size (int, optional): The least number of states of a Gauss-Seidel block, made of whole layers of
+            states at the same distance to the goals. Defaults to 1024.
+
+    Attributes:
+        values (np.ndarray): The value of every state.
+        policy (np.ndarray): The best row of every state, -1 if it has none.
+        iterations (int): The number of sweeps or updates done.
+
+    Methods:
+        solve() -> np.ndarray: Return the values of the states.
+        plan() -> ConditionalPlan|None: Return the optimal plan from the initial state.
+    """
+    def __init__(self, mdp: MDP, gamma: float = 1.0, epsilon: float = 1e-6, max_iter: int = 100000,
+                 mode: str = "jacobi", block_size: int = 1024) -> None:
+        if mode not in ("jacobi", "gauss-seidel", "prioritized"):
+            raise ValueError(f"Unknown mode {mode}")
+        self.mdp = mdp
+        self.gamma = gamma
+        self.epsilon = epsilon
+        self.max_iter = max_iter
+        self.mode = mode
+        self.block_size = block_size
+        self.values = mdp.initial_values()
+        self.policy = np.full(len(mdp), -1, dtype=np.int64)
+        self.iterations = 0
+
+    def solve(self) -> np.ndarray:
+        if self.mode == "jacobi":
+            self._jacobi()
+        elif self.mode == "gauss-seidel":
+            self._gauss_seidel()
+        else:
+            self._prioritized()
+        self.policy = self.mdp.greedy(self.values, self.gamma)
+        return self.values
+
+    def plan(self) -> ConditionalPlan|None:
+        return self.mdp.plan(self.policy, self.values)
+
+    def _jacobi(self) -> None:
+        for self.iterations in range(1, self.max_iter + 1):
+            new = self.mdp.bellman(self.values, self.gamma)
+            residual = _residual(new, self.values)
+            self.values = new
+            if residual < self.epsilon:
+                break
+
+    def _gauss_seidel(self) -> None:
+        mdp = self.mdp
+        # a block depends mostly on the blocks nearer to the goals, which are updated before it in the same sweep
+        distances = mdp.goal_distances()
+        order = np.flatnonzero(distances > 0)
+        order = order[np.argsort(distances[order], kind="stable")]
+        layer_ends = np.flatnonzero(np.diff(distances[order])) + 1
+        blocks, start = [], 0
+        for end in list(layer_ends) + [len(order)]:
+            if end - start >= self.block_size or end == len(order):
+                blocks.append(self._block(order[start:end]))
+                start = end
+        values = self.values
+        for self.iterations in range(1, self.max_iter + 1):
+            residual = 0.0
+            for states, state_starts, costs, self_probs, entry_rows, probs, indices in blocks:
+                q = _q(costs, self_probs, entry_rows, probs, indices, values, self.gamma)
+                new = np.minimum.reduceat(q, state_starts)
+                residual = max(residual, _residual(new, values[states]))
+                values[states] = new
+            if residual < self.epsilon:
+                break
+
+    def _block(self, states: np.ndarray) -> tuple:
+        """Gather the rows and matrix entries of the given states, which all have rows, into contiguous arrays."""
+        mdp = self.mdp
+        rows_ptr, rows = gather(mdp.row_ptr, states)
+        entries_ptr, entries = gather(mdp.indptr, rows)
+        entry_rows = np.repeat(np.arange(len(rows), dtype=np.int64), np.diff(entries_ptr))
+        return (states, rows_ptr[:-1], mdp.costs[rows], mdp.self_probs[rows], entry_rows,
+                mdp.probs[entries], mdp.indices[entries])
+
+    def _prioritized(self) -> None:
+        mdp = self.mdp
+        pred_indptr, pred_entries = mdp.predecessors()
+        values = self.values
+        priority = np.abs(mdp.bellman(values, self.gamma) - np.where(np.isinf(values), 0.0, values))
+        priority[np.isinf(values) | np.isnan(priority)] = 0.0
+        # equal priorities are broken by the distance to the goals, so values flow backwards from the goals
+        distances = mdp.goal_distances()
+        heap = [(-float(priority[s]), int(distances[s]), int(s)) for s in np.flatnonzero(priority >= self.epsilon)]
+        heapq.heapify(heap)
+        self.iterations = 0
+        while heap and self.iterations < self.max_iter:
+            p, _, s = heapq.heappop(heap)
+            if -p != priority[s]:
+                continue
+            priority[s] = 0.0
+            new = mdp.bellman(values, self.gamma, s, s + 1)[0]
+            delta = abs(new - values[s]) if new != values[s] else 0.0
+            values[s] = new
+            self.iterations += 1
+            if delta == 0.0:
+                continue
+            for entry in pred_entries[pred_indptr[s]:pred_indptr[s + 1]]:
+                row = mdp.entry_row[entry]
+                t = int(mdp.row_state[row])
+                q = self.gamma * mdp.probs[entry] * delta / (1 - self.gamma * mdp.self_probs[row])
+                if q >= self.epsilon and q > priority[t]:
+                    priority[t] = q
+                    heapq.heappush(heap, (-q, int(distances[t]), t))
+
+class PolicyIteration:
+    """
+    PolicyIteration class solves an MDP by (modified) policy iteration: the values of the current policy are
+    computed by vectorized sweeps, then every state takes its greedy action, until the policy is stable.
+    It starts from MDP.safe_policy, proper when gamma is 1, as the greedy policy of the initial values can risk
+    states of infinite value, and the states without a safe action are valued inf.
+
+    Args:
+        mdp (MDP): The explicit MDP.
+        gamma (float, optional): The discount factor. Defaults to 1.0.
+        epsilon (float, optional): The largest change of a value allowed when evaluating a policy. Defaults to 1e-6.
+        max_iter (int, optional): The maximum number of policy improvements. Defaults to 1000.
+        eval_iter (int, optional): The maximum number of sweeps to evaluate a policy. Defaults to 10000.
+
+    Attributes:
+        values (np.ndarray): The value of every state.
+        policy (np.ndarray): The row of every state, -1 if it has none.
+        iterations (int): The number of policy improvements done.
+
+    Methods:
+        solve() -> np.ndarray: Return the values of the states.
+        plan() -> ConditionalPlan|None: Return the optimal plan from the initial state.
+    """
+    def __init__(self, mdp: MDP, gamma: float = 1.0, epsilon: float = 1e-6, max_iter: int = 1000, eval_iter: int = 10000) -> None:
+        self.mdp = mdp
+        self.gamma = gamma
+        self.epsilon = epsilon
+        self.max_iter = max_iter
+        self.eval_iter = eval_iter
+        self.values = mdp.initial_values()
+        self.policy = mdp.safe_policy(proper=gamma == 1)
+        self.iterations = 0
+
+    def solve(self) -> np.ndarray:
+        mdp = self.mdp
+        for self.iterations in range(1, self.max_iter + 1):
+            self._evaluate()
+            q = mdp.q_values(self.values, self.gamma)
+            best = mdp.greedy(self.values, self.gamma)
+            # keep the current action unless another one is strictly better, so the policy cannot cycle on ties
+            improve = (best >= 0) & (self.policy >= 0)
+            improve[improve] = q[best[improve]] < q[self.policy[improve]] - self.epsilon
+            improve |= (best >= 0) & (self.policy < 0)
+            if not improve.any():
+                break
+            self.policy[improve] = best[improve]
+        return self.values
+
+    def plan(self) -> ConditionalPlan|None:
+        return self.mdp.plan(self.policy, self.values)
+
+    def _evaluate(self) -> None:
+        mdp = self.mdp
+        # a state that is not a goal and has no action of finite cost cannot reach a goal for sure, whatever its
+        # initial value, and its predecessors must not count it as free
+        self.values[(self.policy < 0) & ~mdp.goals] = np.inf
+        live = np.flatnonzero(self.policy >= 0)
+        rows = self.policy[live]
+        if len(rows) == 0:
+            return
+        entries_ptr, entries = gather(mdp.indptr, rows)
+        entry_rows = np.repeat(np.arange(len(rows), dtype=np.int64), np.diff(entries_ptr))
+        costs, self_probs = mdp.costs[rows], mdp.self_probs[rows]
+        probs, indices = mdp.probs[entries], mdp.indices[entries]
+        values = self.values
+        for _ in range(self.eval_iter):
+            new = _q(costs, self_probs, entry_rows, probs, indices, values, self.gamma)
+            residual = _residual(new, values[live])
+            values[live] = new
+            if residual < self.epsilon:
+                break
@@ -0,0 +1,512 @@
+import os
+import math
+import heapq
+import queue
+import signal
+import time
+import functools
+import threading
+import multiprocessing as mp
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple, Type
+
+from .search import Search
+from .problem import SearchProblem, HeuristicSearchProblem, State, Action
+from .best_first_search import AStar
+from .local_search import LocalSearch
+
+class _HDAWorker:
+    """
+    A worker of HDAStar, run in its own process: it owns the states s with owner(s) % n == id, keeps their open
+    and closed lists, and sends the states it generates for other workers to their owners in batches.
+    """
+    def __init__(self, wid: int, problem: HeuristicSearchProblem, inboxes: list, results, batch_size: int,
+                 owner: Callable[[State], int]) -> None:
+        self.wid = wid
+        self.problem = problem
+        self.inboxes = inboxes
+        self.inbox = inboxes[wid]
+        self.results = results
+        self.batch_size = batch_size
+        self.owner = owner
+        self.g_costs: Dict[State, float] = {}
+        self.parents: Dict[State, tuple] = {}
+        self.open: list = []
+        self.counter = 0
+        self.bound = math.inf
+        self.sent = 0
+        self.received = 0
+        self.expanded = 0
+        self.buffers: List[list] = [[] for _ in inboxes]
+        self.running = True
+
+    def run(self) -> None:
+        init = self.problem.initial_state()
+        if self.owner(init) % len(self.inboxes) == self.wid:
+            self._receive(init, 0, None, None)
+        reported = False
+        while self.running:
+            if self._idle():
+                self._flush()
+                if not reported:
+                    self._report("status")
+                    reported = True
+                message = self.inbox.get()
+                self._handle(message)
+                # the count of batches received changed, so the status is reported again even if still idle
+                reported = reported and message[0] != "states"
+                continue
+            reported = False
+            while True:
+                try:
+                    message = self.inbox.get_nowait()
+                except queue.Empty:
+                    break
+                self._handle(message)
+            self._expand(self.batch_size)
+            self._flush()
+
+    def _idle(self) -> bool:
+        open = self.open
+        while open and open[0][2] > self.g_costs[open[0][3]]:
+            heapq.heappop(open)
+        return not open or open[0][0] >= self.bound
+
+    def _report(self, kind: str, *args) -> None:
+        self.results.put((kind, *args, self.wid, self._idle(), self.sent, self.received, self.expanded))
+
+    def _handle(self, message: tuple) -> None:
+        kind = message[0]
+        if kind == "states":
+            self.received += 1
+            for state, g, parent, action in message[1]:
+                self._receive(state, g, parent, action)
+        elif kind == "bound":
+            self.bound = min(self.bound, message[1])
+        elif kind == "probe":
+            self._flush()
+            self._report("probe", message[1])
+        elif kind == "trace":
+            parent, action = self.parents[message[1]]
+            self.results.put(("parent", parent, action))
+        elif kind == "stop":
+            self.running = False
+
+    def _receive(self, state: State, g: float, parent: State|None, action: Action|None) -> None:
+        if g < self.g_costs.get(state, math.inf):
+            self.g_costs[state] = g
+            self.parents[state] = (parent, action)
+            f = g + self.problem.heuristic(state)
+            if f < self.bound:
+                self.counter += 1
+                heapq.heappush(self.open, (f, self.counter, g, state))
+
+    def _expand(self, n: int) -> None:
+        n_workers = len(self.inboxes)
+        for _ in range(n):
+            if self._idle():
+                return
+            _, _, g, state = heapq.heappop(self.open)
+            self.expanded += 1
+            for action in self.problem.actions(state):
+                next_state = self.problem.result(state, action)
+                next_g = g + self.problem.action_cost(state, action)
+                if next_g >= self.bound:
+                    continue
+                if self.problem.is_goal(next_state):
+                    # an upper bound for all workers, the search goes on until no open state can beat it
+                    self.bound = next_g
+                    self.results.put(("goal", next_g, next_state))
+                owner = self.owner(next_state) % n_workers
+                if owner == self.wid:
+                    self._receive(next_state, next_g, state, action)
+                else:
+                    self.buffers[owner].append((next_state, next_g, state, action))
+
+    def _flush(self) -> None:
+        for owner, buffer in enumerate(self.buffers):
+            if buffer:
+                self.inboxes[owner].put(("states", buffer))
+                self.sent += 1
+                self.buffers[owner] = []
+
+def _run_worker(wid: int, problem: HeuristicSearchProblem, inboxes: list, results, *args) -> None:
+    try:
+        _HDAWorker(wid, problem, inboxes, results, *args).run()
+    except Exception as error:
+        # reported so the coordinator stops the search rather than waiting for this worker forever
+        results.put(("error", wid, repr(error)))
+
+class HDAStar(Search):
+    """
+    HDAStar class represents Hash-Distributed A*: the states are partitioned by hash among worker processes,
+    each running A* on its own open and closed lists and sending the states it generates to their owners in batches.
+    A goal found sets a bound broadcast to all workers. The search ends when no worker has an open state below the
+    bound and no batch is in flight, checked by two consecutive probes counting the same numbers of batches
+    sent and received, so the path is optimal for an admissible heuristic.
+    The problem and the states must be picklable, and owner must give the same value in every process
+    (the fork start method keeps hash() consistent, otherwise set PYTHONHASHSEED or pass owner).
+
+    Args:
+        problem (HeuristicSearchProblem): The search problem.
+        n_workers (int|None, optional): The number of worker processes. Defaults to os.cpu_count().
+        batch_size (int, optional): The number of states a worker expands between two flushes of its batches. Defaults to 64.
+        owner (Callable[[State], int]|None, optional): The hash partitioning the states. Defaults to hash.
+
+    Attributes:
+        cost (float): The cost of the path found, inf if there is none.
+        expanded (int): The number of states expanded by all workers.
+
+    Methods:
+        search(): Return the optimal path from the initial state to a goal.
+    """
+    def __init__(self, problem: HeuristicSearchProblem, n_workers: int|None = None, batch_size: int = 64,
+                 owner: Callable[[State], int]|None = None) -> None:
+        self.problem = problem
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.owner = hash if owner is None else owner
+        self.cost = math.inf
+        self.expanded = 0
+
+    def search(self) -> List[List[Action]]:
+        init = self.problem.initial_state()
+        if self.problem.is_goal(init):
+            self.cost = 0
+            return [[Action.STAY]]
+        context = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else mp.get_context()
+        inboxes = [context.Queue() for _ in range(self.n_workers)]
+        results = context.Queue()
+        workers = [context.Process(target=_run_worker, args=(wid, self.problem, inboxes, results, self.batch_size, self.owner),
+                                   daemon=True) for wid in range(self.n_workers)]
+        for worker in workers:
+            worker.start()
+        try:
+            goal = self._coordinate(inboxes, results, workers)
+            path = [] if goal is None else [self._trace(goal, init, inboxes, results, workers)]
+        finally:
+            for inbox in inboxes:
+                inbox.put(("stop",))
+            for worker in workers:
+                worker.join(1)
+                if worker.is_alive():
+                    worker.terminate()
+                    worker.join()
+        return path
+
+    @staticmethod
+    def _get(results, workers: list) -> tuple:
+        """Return the next message of the workers, raise RuntimeError if one of them failed or died."""
+        while True:
+            try:
+                message = results.get(timeout=0.1)
+            except queue.Empty:
+                for wid, worker in enumerate(workers):
+                    if worker.exitcode is not None:
+                        raise RuntimeError(f"HDAStar worker {wid} exited with code {worker.exitcode}")
+                continue
+            if message[0] == "error":
+                raise RuntimeError(f"HDAStar worker {message[1]} failed: {message[2]}")
+            return message
+
+    def _coordinate(self, inboxes: list, results, workers: list) -> State|None:
+        """Collect the goals and broadcast the bound until the probes detect termination, return the best goal."""
+        goal = None
+        statuses: Dict[int, tuple] = {}
+        probe, replies, last_counts = 0, {}, None
+        probing = False
+        while True:
+            message = self._get(results, workers)
+            kind = message[0]
+            if kind == "goal":
+                if message[1] < self.cost:
+                    self.cost, goal = message[1], message[2]
+                    for inbox in inboxes:
+                        inbox.put(("bound", self.cost))
+                continue
+            if kind == "status":
+                statuses[message[1]] = message[2:]
+            elif kind == "probe" and message[1] == probe:
+                replies[message[2]] = message[3:]
+                if len(replies) < self.n_workers:
+                    continue
+                probing = False
+                counts = (sum(r[1] for r in replies.values()), sum(r[2] for r in replies.values()))
+                quiet = all(r[0] for r in replies.values()) and counts[0] == counts[1]
+                if quiet and counts == last_counts:
+                    self.expanded = sum(r[3] for r in replies.values())
+                    return goal
+                last_counts = counts if quiet else None
+                statuses.update(replies)
+            else:
+                continue
+            all_idle = len(statuses) == self.n_workers and all(s[0] for s in statuses.values())
+            if not probing and all_idle and sum(s[1] for s in statuses.values()) == sum(s[2] for s in statuses.values()):
+                probe += 1
+                probing, replies = True, {}
+                for inbox in inboxes:
+                    inbox.put(("probe", probe))
+
+    def _trace(self, goal: State, init: State, inboxes: list, results, workers: list) -> List[Action]:
+        """Ask the owners of the states of the path for their parents, from the goal back to the initial state."""
+        actions = []
+        state = goal
+        while state != init:
+            inboxes[self.owner(state) % self.n_workers].put(("trace", state))
+            while True:
+                message = self._get(results, workers)
+                if message[0] == "parent":
+                    break
+            state, action = message[1], message[2]
+            actions.append(action)
+        actions.append(Action.STAY)
+        actions.reverse()
+        return actions
+
+class _Timeout(Exception):
+    pass
+
+def _raise_timeout(signum, frame) -> None:
+    raise _Timeout
+
+# the settings of the batch solver in a worker process, set once by _init_batch_worker when it starts
+_batch: dict = {}
+
+def _init_batch_worker(settings: dict) -> None:
+    _batch.update(settings)
+
+def _solve_query(settings: dict, task: Tuple[int, Any]) -> Tuple[int, List[List[Action]]|None]:
+    """Build the problem of a query and search it, return None if the time limit is reached."""
+    index, query = task
+    make, shared, time_limit = settings["make"], settings["shared"], settings["time_limit"]
+    # the alarm signal can only be handled in the main thread, the time limit is not enforced in the others
+    timer = (time_limit is not None and hasattr(signal, "setitimer")
+             and threading.current_thread() is threading.main_thread())
+    if timer:
+        handler = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, time_limit / 1000)
+    try:
+        problem = query if make is None else make(shared, query)
+        return index, settings["algo"](problem, **settings["options"]).search()
+    except _Timeout:
+        return index, None
+    finally:
+        if timer:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, handler)
+
+def _solve_worker_query(task: Tuple[int, Any]) -> Tuple[int, List[List[Action]]|None]:
+    return _solve_query(_batch, task)
+
+class BatchSolver:
+    """
+    BatchSolver class solves many independent queries on a pool of worker processes kept between batches.
+    The shared data (maps, heuristic tables, a CompiledGraph...) is handed to every worker once when it starts,
+    inherited without pickling under the fork start method, and a query is turned into a problem by make(shared, query)
+    in the worker, so only the small queries and the paths cross the processes.
+
+    Args:
+        algo (Type[Search], optional): The search algorithm run on every problem. Defaults to AStar.
+        workers (int|None, optional): The number of worker processes, 0 to solve in this process. Defaults to os.cpu_count().
+        shared (Any, optional): The read-only data given to make. Defaults to None.
+        make (Callable[[Any, Any], SearchProblem]|None, optional): Build the problem of a query from the shared data.
+            Defaults to None, the queries are the problems themselves.
+        time_limit (int|float|None, optional): The time limit of a query in milliseconds, enforced by an alarm signal,
+            so not when solving in this process from a thread other than the main thread. Defaults to None.
+        chunksize (int, optional): The number of queries sent to a worker at once. Defaults to 1.
+        **options: The keyword arguments of algo.
+
+    Methods:
+        solve(queries: Iterable) -> Iterator[Tuple[int, List[List[Action]]|None]]: Yield (index, paths) in completion order.
+        close(): Stop the worker processes.
+    """
+    def __init__(self, algo: Type[Search] = AStar, workers: int|None = None, shared: Any = None,
+                 make: Callable[[Any, Any], SearchProblem]|None = None, time_limit: int|float|None = None,
+                 chunksize: int = 1, **options) -> None:
+        self.settings = {"algo": algo, "shared": shared, "make": make, "time_limit": time_limit, "options": options}
+        self.workers = os.cpu_count() or 1 if workers is None else workers
+        self.chunksize = chunksize
+        self.pool = None
+        if self.workers > 0:
+            context = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else mp.get_context()
+            self.pool = context.Pool(self.workers, _init_batch_worker, (self.settings,))
+
+    def solve(self, queries: Iterable) -> Iterator[Tuple[int, List[List[Action]]|None]]:
+        """
+        Yield (index, paths) for every query as soon as it is solved, where index is its position in queries
+        and paths is None if its time limit was reached.
+        """
+        tasks = enumerate(queries)
+        if self.pool is None:
+            return map(functools.partial(_solve_query, self.settings), tasks)
+        return self.pool.imap_unordered(_solve_worker_query, tasks, self.chunksize)
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self) -> "BatchSolver":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def solve_many(queries: Iterable, algo: Type[Search] = AStar, workers: int|None = None,
+               **kwargs) -> Iterator[Tuple[int, List[List[Action]]|None]]:
+    """
+    Solve the queries on a new pool of workers and yield (index, paths) in completion order, see BatchSolver
+    for the other arguments. Keep a BatchSolver instead to reuse the workers between batches.
+    """
+    with BatchSolver(algo, workers, **kwargs) as solver:
+        yield from solver.solve(queries)
+
+def valid_path(problem: SearchProblem, path: List[Action]) -> bool:
+    """Check that the path, replayed from problem.initial_state() with its Action.STAY skipped, is legal and ends in a goal."""
+    state = problem.initial_state()
+    for action in path:
+        if action == Action.STAY:
+            continue
+        if action not in problem.actions(state):
+            return False
+        state = problem.result(state, action)
+    return problem.is_goal(state)
+
+class Configuration:
+    """
+    Configuration class is one entry of a Portfolio: a search algorithm and its keyword arguments.
+
+    Args:
+        algo (Type[Search|LocalSearch]): The search algorithm.
+        options (Dict[str, Any]|None, optional): The keyword arguments of algo. Defaults to None.
+        name (str|None, optional): The name the configuration is recorded under. Defaults to algo and options.
+        optimal (bool, optional): Whether the paths it finds are provably optimal. Defaults to False.
+    """
+    def __init__(self, algo: Type[Search|LocalSearch], options: Dict[str, Any]|None = None,
+                 name: str|None = None, optimal: bool = False) -> None:
+        self.algo = algo
+        self.options = options or {}
+        self.name = name or algo.__name__ + "".join(f" {key}={value!r}" for key, value in self.options.items())
+        self.optimal = optimal
+
+def _run_configuration(index: int, configuration: Configuration, problem: SearchProblem, results,
+                       validate: Callable[[SearchProblem, List[Action]], bool]) -> None:
+    """Search the problem with one configuration in its own process and report (index, valid paths, error)."""
+    if hasattr(os, "setsid"):
+        # a process group of its own, so the processes the configuration starts are stopped with it
+        os.setsid()
+    paths, error = None, None
+    try:
+        found = configuration.algo(problem, **configuration.options).search()
+        paths = [path for path in found if validate(problem, path)] or None
+    except Exception as exception:
+        error = repr(exception)
+    results.put((index, paths, error))
+
+class Portfolio(Search):
+    """
+    Portfolio class runs several search configurations at once on the same problem, each in its own process,
+    returns the paths of the first one to find a valid path, and terminates the others. With optimal, it waits
+    for the first configuration flagged optimal instead, and falls back on the first valid paths if none succeeds.
+    The winners are recorded in history and counted in wins, so the portfolio can be tuned.
+    Every configuration runs in a process group of its own (on POSIX), which is terminated as a whole,
+    so the processes it starts, e.g. the workers of HDAStar, are stopped with it.
+    Under the fork start method the problem is inherited by the processes, otherwise it must be picklable.
+
+    Args:
+        problem (SearchProblem): The search problem.
+        configurations (Sequence[Configuration|Type[Search|LocalSearch]]): The configurations to run.
+        time_limit (int|float|None, optional): The time limit in milliseconds. Defaults to None.
+        optimal (bool, optional): Whether to wait for a configuration flagged optimal. Defaults to False.
+        validate (Callable[[SearchProblem, List[Action]], bool], optional): Check a path of a configuration in its
+            process. Defaults to valid_path, replace it for problems whose initial_state is random.
+
+    Attributes:
+        winner (str|None): The name of the configuration whose paths the last search returned.
+        elapsed (float): The seconds the last search took.
+        errors (Dict[str, str]): The exceptions raised by the configurations in the last search, by name.
+        history (List[Tuple[str|None, float]]): The winner and the seconds of every search.
+        wins (Dict[str, int]): The number of searches every configuration won.
+
+    Methods:
+        search(): Return the paths of the first configuration to succeed, [] if none does in time.
+    """
+    def __init__(self, problem: SearchProblem, configurations: Sequence[Configuration|Type[Search|LocalSearch]],
+                 time_limit: int|float|None = None, optimal: bool = False,
+                 validate: Callable[[SearchProblem, List[Action]], bool] = valid_path) -> None:
+        if not configurations:
+            raise ValueError("A portfolio needs at least one configuration")
+        self.problem = problem
+        self.configurations = [c if isinstance(c, Configuration) else Configuration(c) for c in configurations]
+        self.time_limit = time_limit
+        self.optimal = optimal
+        self.validate = validate
+        self.winner: str|None = None
+        self.elapsed = 0.0
+        self.errors: Dict[str, str] = {}
+        self.history: List[Tuple[str|None, float]] = []
+        self.wins: Dict[str, int] = {c.name: 0 for c in self.configurations}
+
+    def search(self) -> List[List[Action]]:
+        start = time.monotonic()
+        deadline = None if self.time_limit is None else start + self.time_limit / 1000
+        context = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else mp.get_context()
+        results = context.Queue()
+        # not daemonic, so a configuration can start processes of its own, e.g. HDAStar
+        processes = [context.Process(target=_run_configuration, args=(i, c, self.problem, results, self.validate))
+                     for i, c in enumerate(self.configurations)]
+        for process in processes:
+            process.start()
+        self.errors = {}
+        try:
+            index, paths = self._first(processes, results, deadline)
+        finally:
+            for process in processes:
+                self._stop(process)
+            for process in processes:
+                process.join()
+            results.close()
+        self.elapsed = time.monotonic() - start
+        self.winner = None if index is None else self.configurations[index].name
+        self.history.append((self.winner, self.elapsed))
+        if self.winner is not None:
+            self.wins[self.winner] += 1
+        return paths or []
+
+    @staticmethod
+    def _stop(process) -> None:
+        """Terminate the process group of a configuration, the process alone if it has no group of its own yet."""
+        if hasattr(os, "killpg"):
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+                return
+            except (ProcessLookupError, PermissionError):
+                pass
+        if process.is_alive():
+            process.terminate()
+
+    def _first(self, processes: list, results, deadline: float|None) -> Tuple[int|None, List[List[Action]]|None]:
+        """Wait for the reports of the configurations and return the (index, paths) to keep."""
+        fallback = (None, None)
+        pending = len(processes)
+        while pending:
+            timeout = 0.1 if deadline is None else min(0.1, deadline - time.monotonic())
+            if timeout <= 0:
+                break
+            try:
+                index, paths, error = results.get(timeout=timeout)
+            except queue.Empty:
+                # a process killed without reporting, e.g. out of memory, would be waited for forever
+                if not any(process.is_alive() for process in processes) and results.empty():
+                    break
+                continue
+            pending -= 1
+            if error is not None:
+                self.errors[self.configurations[index].name] = error
+            if paths is None:
+                continue
+            if not self.optimal or self.configurations[index].optimal:
+                return index, paths
+            if fallback[0] is None:
+                fallback = (index, paths)
+        return fallback
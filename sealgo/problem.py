@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
 from enum import Enum, auto
+from typing import Iterator, Iterable, Hashable
+import random
 
 class State(ABC):
     '''
@@ -39,6 +41,7 @@ class Stay(Action):
         return 0
     
 STAY = Stay()
+Action.STAY = STAY
 
 class SearchProblem(ABC):
     """
@@ -50,8 +53,29 @@ class SearchProblem(ABC):
         result(self, state: State, action: Action) -> State: Return the state that results from executing a given action in the given state.
         is_goal(self, state: State) -> bool: Check if the given state is a goal state.
         action_cost(self, s: State, action: Action) -> int|float: Return the cost of taking action from state to another state.
+
+    Methods(optional, override them for large neighbourhoods):
+        iter_actions(self, state: State, rng: random.Random|None) -> Iterator[Action]: Lazily yield the actions that can be executed in the given state.
+        sample_action(self, state: State, rng: random.Random) -> Action|None: Return one action of the given state chosen at random.
+
+    Methods(optional, used by the engines only if symmetric is True):
+        symmetries(self, state: State) -> Iterable[State]: Return the images of the state under the symmetry group of the problem.
+        canonicalize(self, state: State) -> Hashable: Return the canonical form of the state, the same for all its images.
+
+    Methods(optional, used by the engines only if compact is True):
+        encode(self, state: State) -> int|bytes: Return a compact key of the state, e.g. packed with sealgo.encoding.
+        decode(self, key: int|bytes) -> State: Return the state of a key, decode(encode(state)) == state.
+
+    Attributes:
+        symmetric (bool): Whether engines should key their visited sets and caches on canonicalize(state).
+            The symmetries must map goals to goals and keep the costs of actions. Defaults to False.
+        compact (bool): Whether engines should keep encode(state) rather than the states in their tables,
+            decoding a state when it is expanded. Ignored if symmetric, as canonicalize can return a compact key.
+            Defaults to False.
     """
-    
+    symmetric: bool = False
+    compact: bool = False
+
     @abstractmethod
     def initial_state(self) -> State:
         """Return the initial state from which the problem is to be solved."""
@@ -78,7 +102,43 @@ class SearchProblem(ABC):
     def action_cost(self, s: State, action: Action) -> int|float:
         """Return the cost of taking action from state to another state."""
         return 1
-    
+
+    def iter_actions(self, state: State, rng: random.Random|None = None) -> Iterator[Action]:
+        """Lazily yield the actions that can be executed in the given state.
+        If rng is given, the actions are yielded in a random order.
+        The default builds the whole list with actions(), override it to avoid that.
+        """
+        actions = self.actions(state)
+        if rng is not None:
+            actions = list(actions)
+            rng.shuffle(actions)
+        return iter(actions)
+
+    def sample_action(self, state: State, rng: random.Random) -> Action|None:
+        """Return one action of the given state chosen uniformly at random, or None if there is none.
+        The default builds the whole list with actions(), override it to avoid that.
+        """
+        actions = self.actions(state)
+        return rng.choice(actions) if actions else None
+
+    def symmetries(self, state: State) -> Iterable[State]:
+        """Return the images of the given state under the symmetry group of the problem, itself included."""
+        return (state,)
+
+    def canonicalize(self, state: State) -> Hashable:
+        """Return the canonical form of the given state, the least of its images by default.
+        Override it with a direct computation, e.g. an int key, for a fast canonical-key path.
+        """
+        return min(self.symmetries(state))
+
+    def encode(self, state: State) -> int|bytes:
+        """Return a compact key of the given state, the state itself by default."""
+        return state
+
+    def decode(self, key: int|bytes) -> State:
+        """Return the state of the given key, the inverse of encode."""
+        return key
+
 class HeuristicSearchProblem(SearchProblem):
     '''
     A class representing a heuristic search problem.
@@ -90,11 +150,24 @@ class HeuristicSearchProblem(SearchProblem):
         is_goal(self, state: State) -> bool: Check if the given state is a goal state.
         action_cost(self, s: State, action: Action) -> int|float: Return the cost of taking action from state to another state.
         heuristic(state: State) -> float: Returns the heuristic value of the given state.
+
+    Methods(optional, override it for partial expansion):
+        action_deltas(self, state: State) -> list[tuple[Action, float]]: Return the actions of the given state with the change of f they make.
     '''
     @abstractmethod
     def heuristic(self, state: State) -> float:
         """Return the heuristic value of the given state."""
         pass
+
+    def action_deltas(self, state: State) -> list[tuple[Action, float]]:
+        """Return the actions of the given state with the change of f they make, action_cost + h(child) - h(state).
+        This is the operator selection function of EPEAStar, which then generates only the children it needs.
+        The default generates every child, override it with a direct computation that does not, as EightQueens of
+        tests/queen.py does from the queens on every line.
+        """
+        h = self.heuristic(state)
+        return [(action, self.action_cost(state, action) + self.heuristic(self.result(state, action)) - h)
+                for action in self.actions(state)]
     
 class BiSearchProblem(SearchProblem):
     """
@@ -127,9 +200,139 @@ class BiSearchProblem(SearchProblem):
     @abstractmethod
     def re_heuristic(self, state: State) -> int|float:
         pass
-    
-class GameState(ABC):
+
+class GridSearchProblem(HeuristicSearchProblem):
+    """
+    A class representing a search problem on a uniform-cost grid, where a state stands on a cell (row, column)
+    and moves to an adjacent passable cell at cost 1 (sqrt(2) diagonally, without cutting blocked corners).
+
+    Methods(must be realized in subclasses, besides those of HeuristicSearchProblem):
+        grid_shape(self) -> tuple[int, int]: Return the number of rows and columns of the grid.
+        passable(self, cell: tuple[int, int]) -> bool: Check if the given cell can be stood on.
+        cell(self, state: State) -> tuple[int, int]: Return the cell of the given state.
+        goal_cells(self) -> list[tuple[int, int]]: Return the cells of the goal states.
+
+    Attributes:
+        diagonal (bool): Whether the grid is 8-connected rather than 4-connected. Defaults to False.
+    """
+    diagonal: bool = False
+
+    @abstractmethod
+    def grid_shape(self) -> tuple[int, int]:
+        pass
+
+    @abstractmethod
+    def passable(self, cell: tuple[int, int]) -> bool:
+        pass
+
+    @abstractmethod
+    def cell(self, state: State) -> tuple[int, int]:
+        pass
+
     @abstractmethod
+    def goal_cells(self) -> list[tuple[int, int]]:
+        pass
+
+class UncertainSearchProblem(SearchProblem):
+    """
+    A class representing a search problem with nondeterministic actions.
+
+    Methods(must be realized in subclasses):
+        initial_state(self) -> State: Return the initial state from which the problem is to be solved.
+        actions(self, state: State) -> list[Action]: Return a list of actions that can be executed in the given state.
+        result(self, state: State, action: Action) -> list[tuple[State, float]]: Return the possible outcomes of executing a given action in the given state, with their probabilities.
+        is_goal(self, state: State) -> bool: Check if the given state is a goal state.
+        action_cost(self, s: State, action: Action) -> int|float: Return the cost of taking action from state to another state.
+
+    Methods(optional):
+        heuristic(self, state: State) -> int|float: Return an estimate of the expected cost to reach a goal. Defaults to 0.
+    """
+    @abstractmethod
+    def result(self, state: State, action: Action) -> list[tuple[State, float]]:
+        """Return the possible outcomes of executing a given action in the given state, with their probabilities."""
+        pass
+
+    def heuristic(self, state: State) -> int|float:
+        """Return an estimate of the expected cost to reach a goal from the given state."""
+        return 0
+
+class GameState(State):
+    '''
+    Represents a state of a two-player game: a board state and the player to move.
+
+    Attributes:
+        state (State): The board state.
+        player (Enum): The player to move.
+    '''
     def __init__(self, state: State, player: Enum) -> None:
         self.state = state
-        self.player = Enum
\ No newline at end of file
+        self.player = player
+
+    def __hash__(self) -> int:
+        return hash((self.state, self.player))
+
+class GameProblem(ABC):
+    """
+    An abstract class representing a two-player zero-sum game.
+    Values are always seen from the player to move in the given state (negamax convention).
+
+    Methods(must be realized in subclasses):
+        initial_state(self) -> State: Return the state to search from.
+        actions(self, state: State) -> list[Action]: Return a list of moves that can be played in the given state.
+        result(self, state: State, action: Action) -> State: Return the state that results from playing a given move.
+        is_terminal(self, state: State) -> bool: Check if the game is over in the given state.
+        utility(self, state: State) -> int|float: Return the final value of a terminal state for the player to move.
+        heuristic(self, state: State) -> int|float: Return the estimated value of a non-terminal state for the player to move.
+
+    Methods(optional):
+        key(self, state: State) -> int: Return the transposition key of a state, e.g. a Zobrist key. Defaults to the hash of its canonical form.
+        child_key(self, state: State, key: int, action: Action, child: State) -> int: Return the key of a child, override it to update keys incrementally.
+        symmetries(self, state: State) -> Iterable[State]: Return the images of the state under the symmetry group of the game.
+        canonicalize(self, state: State) -> Hashable: Return the canonical form of the state, the same for all its images.
+
+    Attributes:
+        symmetric (bool): Whether the default key should be computed from canonicalize(state). Defaults to False.
+    """
+    symmetric: bool = False
+
+    @abstractmethod
+    def initial_state(self) -> State:
+        pass
+
+    @abstractmethod
+    def actions(self, state: State) -> list[Action]:
+        pass
+
+    @abstractmethod
+    def result(self, state: State, action: Action) -> State:
+        pass
+
+    @abstractmethod
+    def is_terminal(self, state: State) -> bool:
+        pass
+
+    @abstractmethod
+    def utility(self, state: State) -> int|float:
+        pass
+
+    @abstractmethod
+    def heuristic(self, state: State) -> int|float:
+        pass
+
+    def key(self, state: State) -> int:
+        """Return the transposition key of the given state."""
+        if self.symmetric:
+            return hash(self.canonicalize(state))
+        return hash(state)
+
+    def child_key(self, state: State, key: int, action: Action, child: State) -> int:
+        """Return the transposition key of child = result(state, action), knowing key = key(state)."""
+        return self.key(child)
+
+    def symmetries(self, state: State) -> Iterable[State]:
+        """Return the images of the given state under the symmetry group of the game, itself included."""
+        return (state,)
+
+    def canonicalize(self, state: State) -> Hashable:
+        """Return the canonical form of the given state, the least of its images by default."""
+        return min(self.symmetries(state))
\ No newline at end of file
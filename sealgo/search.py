@@ -1,13 +1,94 @@
+import time
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Generator, List
 
 from .problem import SearchProblem, Action
 
-class Search(ABC):
+class Stepwise:
+    """
+    The stepping interface of the engines: step runs a few units of work of a search (expansions, rounds, moves)
+    and returns, and asearch runs the search in slices with an await between them, so it does not stall an asyncio
+    event loop. An engine supports it by writing its loop as the generator _steps, which yields after every unit
+    and returns the result of search; the other engines run their whole search in their first step.
+    Like search, the steps go on from the tables the engine holds: an engine that builds them in __init__, such as
+    BestFirstSearch and its subclasses, is single-use, so build a new one for a new search.
+    """
+    _stepper = None
+
+    def _steps(self) -> Generator[None, None, List[List[Action]]]:
+        return self.search()
+        yield
+
+    def _run(self, steps: Generator[None, None, List[List[Action]]]) -> List[List[Action]]:
+        """Run the steps of a search to the end and return its result."""
+        try:
+            while True:
+                next(steps)
+        except StopIteration as stop:
+            return stop.value
+
+    def step(self, n: int = 1, time_limit: int|float|None = None) -> List[List[Action]]|None:
+        """
+        Run at most n units of the search, or fewer once time_limit milliseconds have passed, and return
+        the result of the search if it is over, else None. The step after the end runs _steps again, which starts
+        a new search only for the engines that reset their tables in _steps, such as MCTS.
+        """
+        if self._stepper is None:
+            self._stepper = self._steps()
+        deadline = None if time_limit is None else time.monotonic() + time_limit / 1000
+        try:
+            for _ in range(n):
+                next(self._stepper)
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+        except StopIteration as stop:
+            self._stepper = None
+            return stop.value
+        return None
+
+    def cancel(self) -> None:
+        """Drop the generator run by step, the next step runs _steps again on the tables the engine holds."""
+        if self._stepper is not None:
+            self._stepper.close()
+            self._stepper = None
+
+    async def asearch(self, budget: int = 1000, slice_time: int|float|None = None,
+                      time_limit: int|float|None = None) -> List[List[Action]]:
+        """
+        Run the search in slices of at most budget units (and slice_time milliseconds), yielding to the event loop
+        between them, and return its result. Raise TimeoutError once time_limit milliseconds have passed.
+        The search is dropped if the task is cancelled.
+        """
+        deadline = None if time_limit is None else time.monotonic() + time_limit / 1000
+        try:
+            while True:
+                result = self.step(budget, slice_time)
+                if result is not None:
+                    return result
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f"{type(self).__name__} did not finish in {time_limit} ms")
+                await asyncio.sleep(0)
+        except BaseException:
+            self.cancel()
+            raise
+
+class Search(Stepwise, ABC):
+    # a Checkpointer ticked by the engines that support checkpoints, see sealgo.checkpoint
+    checkpoint = None
+
     @abstractmethod
     def __init__(self, problem: SearchProblem) -> None:
         self.problem = problem
     
     @abstractmethod
     def search(self) -> List[List[Action]]:
-        pass
\ No newline at end of file
+        pass
+    
+    def _checkpoint_state(self) -> dict:
+        """Return the tables and values of the search a checkpoint saves, by name."""
+        raise NotImplementedError(f"{type(self).__name__} does not support checkpoints")
+    
+    def _restore_state(self, tables: dict) -> None:
+        """Restore the tables and values returned by _checkpoint_state."""
+        raise NotImplementedError(f"{type(self).__name__} does not support checkpoints")
\ No newline at end of file
@@ -0,0 +1,170 @@
+import math
+import heapq
+from collections import OrderedDict
+from itertools import count
+from typing import Callable, Dict, List
+
+from .search import Search
+from .problem import SearchProblem, State, Action
+
+class ShortestPathTree:
+    """
+    ShortestPathTree class grows a Dijkstra shortest-path tree from one source on demand: a query settles states
+    only until its target is settled, and the frontier is kept for the next queries, so a target settled before
+    is answered without any expansion.
+
+    Args:
+        problem (SearchProblem): The search problem, costs must be nonnegative.
+        source (State): The root of the tree.
+
+    Attributes:
+        distances (Dict[State, float]): The distance of the settled states from the source.
+        predecessors (Dict[State, tuple]): The (parent, action) of the states reached, settled or in the frontier.
+        order (List[State]): The settled states, in order of distance.
+
+    Methods:
+        settle(target: State) -> bool: Grow the tree until the target is settled, return whether it is reachable.
+        distance(target: State) -> float: Return the distance from the source to the target, inf if unreachable.
+        path(target: State) -> List[Action]|None: Return the shortest path from the source to the target.
+        nearest(goal: Callable[[State], bool]) -> State|None: Return the nearest state satisfying goal, resuming
+            the scan of the settled states where the last call with an equal goal stopped, so goal must not change.
+            The scans of the 16 most recently used goals are kept.
+    """
+    _MAX_GOALS = 16
+
+    def __init__(self, problem: SearchProblem, source: State) -> None:
+        self.problem = problem
+        self.source = source
+        self.distances: Dict[State, float] = {}
+        self.predecessors: Dict[State, tuple] = {source: (None, Action.STAY)}
+        self.order: List[State] = []
+        self._g: Dict[State, float] = {source: 0}
+        self._counter = count()
+        self._frontier = [(0, next(self._counter), source)]
+        # the number of settled states in order known not to satisfy the goals recently passed to nearest
+        self._checked: OrderedDict = OrderedDict()
+
+    def _settle_next(self) -> State|None:
+        """Settle the nearest state of the frontier and return it, None once the tree spans all reachable states."""
+        frontier, g_costs = self._frontier, self._g
+        while frontier:
+            g, _, state = heapq.heappop(frontier)
+            if state in self.distances or g > g_costs[state]:
+                continue
+            self.distances[state] = g
+            self.order.append(state)
+            for action in self.problem.actions(state):
+                next_state = self.problem.result(state, action)
+                next_g = g + self.problem.action_cost(state, action)
+                if next_state not in self.distances and next_g < g_costs.get(next_state, math.inf):
+                    g_costs[next_state] = next_g
+                    self.predecessors[next_state] = (state, action)
+                    heapq.heappush(frontier, (next_g, next(self._counter), next_state))
+            return state
+        return None
+
+    def settle(self, target: State) -> bool:
+        while target not in self.distances:
+            if self._settle_next() is None:
+                return False
+        return True
+
+    def distance(self, target: State) -> float:
+        return self.distances[target] if self.settle(target) else math.inf
+
+    def path(self, target: State) -> List[Action]|None:
+        if not self.settle(target):
+            return None
+        actions = []
+        state = target
+        while state is not None:
+            state, action = self.predecessors[state]
+            actions.append(action)
+        actions.reverse()
+        return actions
+
+    def nearest(self, goal: Callable[[State], bool]) -> State|None:
+        """Return the nearest state satisfying goal, looking at the settled states not checked yet, then growing the tree."""
+        order = self.order
+        start = self._checked.pop(goal, 0)
+        while len(self._checked) >= self._MAX_GOALS:
+            self._checked.popitem(last=False)
+        for i in range(start, len(order)):
+            if goal(order[i]):
+                self._checked[goal] = i
+                return order[i]
+        while (state := self._settle_next()) is not None:
+            if goal(state):
+                self._checked[goal] = len(order) - 1
+                return state
+        self._checked[goal] = len(order)
+        return None
+
+class ShortestPathTreeCache:
+    """
+    ShortestPathTreeCache class keeps the shortest-path trees of the most recently queried sources,
+    evicting the least recently used tree beyond max_trees.
+
+    Args:
+        problem (SearchProblem): The search problem.
+        max_trees (int, optional): The most trees kept. Defaults to 16.
+
+    Methods:
+        tree(source: State) -> ShortestPathTree: Return the tree of the source, grown by the previous queries.
+        distance(source: State, target: State) -> float: Return the distance from source to target.
+        path(source: State, target: State) -> List[Action]|None: Return the shortest path from source to target.
+    """
+    def __init__(self, problem: SearchProblem, max_trees: int = 16) -> None:
+        self.problem = problem
+        self.max_trees = max_trees
+        self._trees: OrderedDict = OrderedDict()
+
+    def tree(self, source: State) -> ShortestPathTree:
+        tree = self._trees.get(source)
+        if tree is None:
+            tree = self._trees[source] = ShortestPathTree(self.problem, source)
+            while len(self._trees) > self.max_trees:
+                self._trees.popitem(last=False)
+        else:
+            self._trees.move_to_end(source)
+        return tree
+
+    def distance(self, source: State, target: State) -> float:
+        return self.tree(source).distance(target)
+
+    def path(self, source: State, target: State) -> List[Action]|None:
+        return self.tree(source).path(target)
+
+    def __len__(self) -> int:
+        return len(self._trees)
+
+class OneToAll(Search):
+    """
+    OneToAll class represents Dijkstra answered from a cached shortest-path tree of the initial state:
+    the tree is grown only until the goal is settled, and kept for the next searches sharing the cache.
+
+    Args:
+        problem (SearchProblem): The search problem.
+        goal (State|Callable[[State], bool]|None, optional): The target state, or a goal test if it is callable.
+            Defaults to problem.is_goal.
+        cache (ShortestPathTreeCache|None, optional): The cache of trees shared between searches. Defaults to a new one.
+
+    Attributes:
+        cost (float): The cost of the path found, inf if there is none.
+    """
+    def __init__(self, problem: SearchProblem, goal: State|Callable[[State], bool]|None = None,
+                 cache: ShortestPathTreeCache|None = None) -> None:
+        self.problem = problem
+        self.goal = problem.is_goal if goal is None else goal
+        self.cache = ShortestPathTreeCache(problem) if cache is None else cache
+        self.cost = math.inf
+
+    def search(self) -> List[List[Action]]:
+        tree = self.cache.tree(self.problem.initial_state())
+        target = tree.nearest(self.goal) if callable(self.goal) else self.goal
+        path = None if target is None else tree.path(target)
+        if path is None:
+            self.cost = math.inf
+            return []
+        self.cost = tree.distances[target]
+        return [path]
@@ -12,7 +12,7 @@ setuptools.setup(
     author='Sunny Lin',
     author_email='sunnylinyy@outlook.com',
     packages=setuptools.find_packages(),
-    install_requires=[],
+    install_requires=['numpy'],
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
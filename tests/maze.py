@@ -1,5 +1,4 @@
-from enum import auto
-from sealgo.problem import State, Action, HeuristicSearchProblem
+from sealgo.problem import State, Action, GridSearchProblem
 
 class MazeState(State):
     def __init__(self, position, goal):
@@ -15,7 +14,7 @@ class MazeState(State):
     def __lt__(self, other):
         return self.position < other.position
 
-class MazeProblem(HeuristicSearchProblem):
+class MazeProblem(GridSearchProblem):
     def __init__(self, initial, goal, maze):
         self.initial = MazeState(initial, goal)
         self.goal = MazeState(goal, goal)
@@ -30,7 +29,7 @@ class MazeProblem(HeuristicSearchProblem):
         for d in directions:
             new_position = (state.position[0] + d[0], state.position[1] + d[1])
             if 0 <= new_position[0] < len(self.maze) and 0 <= new_position[1] < len(self.maze[0]) and self.maze[new_position[0]][new_position[1]] == 0:
-                actions.append(Action(new_position))
+                actions.append(MazeAction(new_position))
         return actions
 
     def result(self, state, action):
@@ -43,7 +42,27 @@ class MazeProblem(HeuristicSearchProblem):
         return 1
 
     def heuristic(self, state):
-        return abs(state.position[0] - state.goal.position[0]) + abs(state.position[1] - state.goal.position[1])
+        return abs(state.position[0] - self.goal.position[0]) + abs(state.position[1] - self.goal.position[1])
+
+    def grid_shape(self):
+        return len(self.maze), len(self.maze[0])
+
+    def passable(self, cell):
+        return self.maze[cell[0]][cell[1]] == 0
+
+    def cell(self, state):
+        return state.position
+
+    def goal_cells(self):
+        return [self.goal.position]
 
 class MazeAction(Action):
-    MOVE = auto()
+    def __init__(self, value):
+        self.value = value
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def __repr__(self):
+        return f"MazeAction({self.value})"
+
@@ -1,7 +1,8 @@
 import itertools
+import math
 import random
 from functools import lru_cache
-from typing import Any
+from typing import Any, Iterator
 from enum import Enum, auto
 from sealgo.problem import HeuristicSearchProblem, State, Action
 
@@ -45,6 +46,32 @@ class EightQueens(HeuristicSearchProblem): # type: ignore
         return [QAction(i, j) for i, j in 
                 itertools.product(range(self.scale), range(self.scale)) if j != state[i]]
     
+    def iter_actions(self, state: QState, rng: random.Random|None = None) -> Iterator[QAction]:
+        """
+        Yield the n*(n-1) moves one by one. With an rng, walk the move indices with a random
+        start and a random stride coprime to their count, a random order that needs no list.
+        """
+        n = self.scale
+        count = n * (n-1)
+        if count == 0:
+            return
+        start, stride = 0, 1
+        if rng is not None:
+            start = rng.randrange(count)
+            stride = rng.randrange(1, count+1)
+            while math.gcd(stride, count) != 1:
+                stride -= 1
+        for k in range(count):
+            row, column = divmod((start + k*stride) % count, n-1)
+            yield QAction(row, column + (column >= state[row]))
+    
+    def sample_action(self, state: QState, rng: random.Random) -> QAction|None:
+        if self.scale < 2:
+            return None
+        row = rng.randrange(self.scale)
+        column = rng.randrange(self.scale-1)
+        return QAction(row, column + (column >= state[row]))
+    
     def result(self, state: QState, action: QAction) -> QState:
         return QState(state[:action.row] + (action.to_column,) + state[action.row+1:])
     
@@ -57,6 +84,27 @@ class EightQueens(HeuristicSearchProblem): # type: ignore
     def heuristic(self, state: QState) -> int:
         return self.num_conflict_pairs(state)
     
+    def action_deltas(self, state: QState) -> list[tuple[QAction, int]]:
+        """
+        Return every move with the change of f it makes, 1 + the conflicts of the queen on its new square
+        - those on its old one, counted from the queens on every column and diagonal without building the children.
+        """
+        n = self.scale
+        columns, diagonals, anti_diagonals = [0] * n, [0] * (2*n-1), [0] * (2*n-1)
+        for row, column in enumerate(state):
+            columns[column] += 1
+            diagonals[row - column + n-1] += 1
+            anti_diagonals[row + column] += 1
+        deltas = []
+        for row, old in enumerate(state):
+            # the queen itself is counted once on each of its old lines
+            before = columns[old] + diagonals[row - old + n-1] + anti_diagonals[row + old] - 3
+            for column in range(n):
+                if column != old:
+                    after = columns[column] + diagonals[row - column + n-1] + anti_diagonals[row + column]
+                    deltas.append((QAction(row, column), 1 + after - before))
+        return deltas
+    
     @lru_cache(maxsize=MAX_CACHE)
     def num_conflict_pairs(self, state: QState) -> int:
         """